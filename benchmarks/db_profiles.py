@@ -0,0 +1,119 @@
+"""Benchmark for the database engine profiles in db.session.
+
+Runs a mixed reminder workload (create, the due reminder poll and guild
+listing) from concurrent workers against a default engine and the tuned
+profile, reporting throughput and per operation latency. SQLite runs on
+temporary files; pass --postgres-url to also compare against Postgres.
+
+Usage:
+    uv run python benchmarks/db_profiles.py [--workers N] [--ops N] [--postgres-url URL]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from datetime import timedelta
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel, delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from pyWeastCoastBot.db.models import Reminder
+from pyWeastCoastBot.db.session import create_engine
+from pyWeastCoastBot.utils.time import utc_now
+
+GUILDS = [str(guild_id) for guild_id in range(5)]
+# Operation mix, roughly a busy server: the poll runs constantly, commands are rarer
+WORKLOAD = dict(insert=3, poll=5, list=2)
+
+
+async def insert(session, rng):
+    remind_time = utc_now() + timedelta(seconds=rng.uniform(-5, 60))
+    session.add(
+        Reminder(
+            user_id=str(rng.randrange(50)),
+            guild_id=rng.choice(GUILDS),
+            channel_id="1",
+            message_id="1",
+            message="benchmark",
+            remind_time=remind_time,
+        )
+    )
+    await session.commit()
+
+
+async def poll(session, rng):
+    result = await session.exec(
+        select(Reminder).where(Reminder.remind_time <= utc_now()).order_by(Reminder.remind_time)
+    )
+    reminder_ids = [reminder.id for reminder in result.all()]
+    if reminder_ids:
+        await session.exec(delete(Reminder).where(Reminder.id.in_(reminder_ids)))
+        await session.commit()
+
+
+async def list_guild(session, rng):
+    stmt = select(Reminder).where(Reminder.guild_id == rng.choice(GUILDS)).order_by(Reminder.remind_time)
+    (await session.exec(stmt)).all()
+
+
+OPERATIONS = dict(insert=insert, poll=poll, list=list_guild)
+
+
+async def worker(sessions, ops, seed, timings):
+    rng = random.Random(seed)
+    names = rng.choices(list(WORKLOAD), weights=list(WORKLOAD.values()), k=ops)
+    for name in names:
+        start = time.perf_counter()
+        async with sessions() as session:
+            await OPERATIONS[name](session, rng)
+        timings[name].append((time.perf_counter() - start) * 1000)
+
+
+async def run_profile(name, engine, workers, ops):
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all, tables=[Reminder.__table__])
+        await conn.run_sync(SQLModel.metadata.create_all, tables=[Reminder.__table__])
+
+    sessions = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    timings = defaultdict(list)
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(sessions, ops, seed, timings) for seed in range(workers)))
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+
+    columns = "".join(f"{f'{op} p50':>12}{f'{op} p95':>12}" for op in OPERATIONS)
+    row = ""
+    for op in OPERATIONS:
+        values = timings[op]
+        p95 = statistics.quantiles(values, n=20)[-1] if len(values) > 1 else values[0]
+        row += f"{statistics.median(values):>12.2f}{p95:>12.2f}"
+    if name.endswith("default"):
+        print(f"{'profile':<20}{'ops/s':>10}{columns}")
+    print(f"{name:<20}{workers * ops / elapsed:>10.0f}{row}")
+
+
+async def run(workers, ops, postgres_url):
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile, make_engine in (("default", create_async_engine), ("tuned", create_engine)):
+            url = f"sqlite+aiosqlite:///{Path(tmp) / f'{profile}.sqlite3'}"
+            await run_profile(f"sqlite {profile}", make_engine(url), workers, ops)
+
+    if postgres_url:
+        for profile, make_engine in (("default", create_async_engine), ("tuned", create_engine)):
+            await run_profile(f"postgres {profile}", make_engine(postgres_url), workers, ops)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8, help="concurrent workers")
+    parser.add_argument("--ops", type=int, default=250, help="operations per worker")
+    parser.add_argument("--postgres-url", help="postgresql+asyncpg:// URL of a scratch database")
+    args = parser.parse_args()
+    asyncio.run(run(args.workers, args.ops, args.postgres_url))
@@ -0,0 +1,147 @@
+"""Micro-benchmark for utils.graph line plot rendering.
+
+Renders the chart shapes the bot produces (intraday stonk, long stonk
+history raw and downsampled, fitbot leaderboard) and reports per-render
+wall time and peak traced memory, plus the process max RSS. Each shape is
+rendered by the reused figure templates and by the baseline they replaced,
+a new pyplot figure laid out with tight_layout per render.
+
+Max RSS is a high-water mark for the whole process, pass --renderer to
+measure one renderer on its own.
+
+Usage:
+    uv run python benchmarks/render_line_plot.py [--renders N] [--renderer {templates,baseline,both}]
+"""
+
+import argparse
+import io
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+
+import matplotlib.dates as mdates
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from pyWeastCoastBot.utils.graph import DPI, FIGSIZE, TEXT_COLOR, WIDTH_PX, generate_line_plot_image
+from pyWeastCoastBot.utils.math import min_max_downsample
+
+
+def baseline_line_plot_image(df, x, y, xlabel=None, ylabel=None, legend_title=None, labels=None):
+    """The render path before figure templates: a new pyplot figure, styled and laid out per render."""
+    labels = labels or {}
+    xlabel = xlabel or (labels.get(x) if isinstance(x, str) else None)
+    ylabel = ylabel or (labels.get(y) if isinstance(y, str) else None)
+    x_data = df[x] if isinstance(x, str) and x in df.columns else x
+    is_datetime = pd.api.types.is_datetime64_any_dtype(x_data)
+    if is_datetime:
+        x_data = pd.DatetimeIndex(x_data)
+        x_data = (x_data.tz_localize("UTC") if x_data.tz is None else x_data).tz_convert("America/New_York")
+
+    fig, ax = plt.subplots(figsize=FIGSIZE)
+    fig.patch.set_alpha(0.0)
+    ax.patch.set_alpha(0.0)
+    for col in y if isinstance(y, list) else [y]:
+        ax.plot(x_data, df[col], label=labels.get(col, col), linewidth=3)
+
+    for spine in ax.spines.values():
+        spine.set_color(TEXT_COLOR)
+    ax.tick_params(axis="x", colors=TEXT_COLOR, labelcolor=TEXT_COLOR, labelsize=14)
+    ax.tick_params(axis="y", colors=TEXT_COLOR, labelcolor=TEXT_COLOR, labelsize=14)
+    if xlabel:
+        ax.set_xlabel(xlabel, color=TEXT_COLOR, fontsize=18)
+    if ylabel:
+        ax.set_ylabel(ylabel, color=TEXT_COLOR, fontsize=18)
+    if legend_title or (isinstance(y, list) and len(y) > 1):
+        legend = ax.legend(title=legend_title, fontsize=14, title_fontsize=16)
+        legend.get_frame().set_alpha(0.0)
+        plt.setp(legend.get_texts(), color=TEXT_COLOR)
+        plt.setp(legend.get_title(), color=TEXT_COLOR)
+    if is_datetime:
+        locator = mdates.AutoDateLocator(tz=x_data.tz)
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator, tz=x_data.tz))
+
+    plt.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", transparent=True, dpi=DPI)
+    plt.close(fig)
+    buf.seek(0)
+    return buf
+
+
+RENDERERS = {
+    "templates": generate_line_plot_image,
+    "baseline": baseline_line_plot_image,
+}
+
+
+def _price_df(points, freq):
+    time_index = pd.date_range("2024-01-02 14:30", periods=points, freq=freq, tz="UTC")
+    price = 100 + np.cumsum(np.random.default_rng(0).normal(size=points))
+    return pd.DataFrame(dict(time=time_index, price=price))
+
+
+def _downsampled(df):
+    time_values, price = min_max_downsample(df["time"].to_numpy(), df["price"].to_numpy(), 2 * WIDTH_PX)
+    return pd.DataFrame(dict(time=pd.DatetimeIndex(time_values, tz="UTC"), price=price))
+
+
+def _steps_df(users):
+    days = [pd.Timestamp("2024-01-01") + pd.Timedelta(days=i) for i in range(7)]
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({f"user {i}": rng.integers(2000, 15000, size=7) for i in range(users)}, index=days)
+
+
+def scenarios():
+    price_kwargs = dict(x="time", y="price", labels=dict(time="Time", price="Price (USD)"))
+    steps = _steps_df(10)
+    steps_kwargs = dict(x=steps.index, y=list(steps.columns), xlabel="Date", ylabel="Steps", legend_title="Users")
+    long_history = _price_df(10_000, "D")
+    return {
+        "stonk 1d/15m": (_price_df(26, "15min"), price_kwargs),
+        "stonk max/1d": (long_history, price_kwargs),
+        "stonk max/1d ds": (_downsampled(long_history), price_kwargs),
+        "fitbot 10 users": (steps, steps_kwargs),
+    }
+
+
+def run(renders, renderer_names):
+    print(f"{'renderer':<11}{'scenario':<18}{'first ms':>10}{'mean ms':>10}{'p95 ms':>10}{'peak KiB':>10}")
+    for renderer_name in renderer_names:
+        render = RENDERERS[renderer_name]
+        for name, (df, kwargs) in scenarios().items():
+            timings = []
+            for _ in range(renders):
+                start = time.perf_counter()
+                render(df, **kwargs)
+                timings.append((time.perf_counter() - start) * 1000)
+
+            # Traced separately, tracemalloc slows rendering down considerably
+            tracemalloc.start()
+            render(df, **kwargs)
+            peak_kib = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+
+            steady = timings[1:] or timings
+            p95 = statistics.quantiles(steady, n=20)[-1] if len(steady) > 1 else steady[0]
+            print(
+                f"{renderer_name:<11}{name:<18}{timings[0]:>10.1f}{statistics.mean(steady):>10.1f}"
+                f"{p95:>10.1f}{peak_kib:>10.0f}"
+            )
+
+    max_rss_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        max_rss_kib /= 1024
+    print(f"max RSS: {max_rss_kib / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--renders", type=int, default=20, help="renders per scenario")
+    parser.add_argument("--renderer", choices=[*RENDERERS, "both"], default="both", help="render path to measure")
+    args = parser.parse_args()
+    run(args.renders, list(RENDERERS) if args.renderer == "both" else [args.renderer])
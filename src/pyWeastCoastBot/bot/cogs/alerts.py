@@ -0,0 +1,140 @@
+import asyncio
+import logging
+from collections import defaultdict
+
+from discord import Option
+from discord.commands import SlashCommandGroup
+from discord.ext import commands, tasks
+
+from pyWeastCoastBot.lib.alerts.alert_types import AlertKind, AssetType
+from pyWeastCoastBot.lib.alerts.service import AlertService
+from pyWeastCoastBot.utils.errors import InvalidParameter, NotFound
+from pyWeastCoastBot.utils.metrics import instrument_task, mark_failed
+from pyWeastCoastBot.utils.string import format_money
+
+
+def describe_alert(alert):
+    kind = AlertKind(alert.kind)
+    if kind == AlertKind.move:
+        return f"{alert.symbol} moves {alert.threshold:g}% from {format_money(alert.reference_price)}"
+    return f"{alert.symbol} {kind.value} {format_money(alert.threshold)}"
+
+
+class Alerts(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.service = AlertService()
+        self.check_alerts.start()
+
+    def cog_unload(self):
+        self.check_alerts.cancel()
+
+    alerts = SlashCommandGroup("alerts", "Stock and crypto price alerts", guild_only=True)
+
+    @tasks.loop(seconds=60)
+    @instrument_task
+    async def check_alerts(self):
+        # An uncaught error would stop the loop, fired alerts stay indexed and are retried next time
+        try:
+            triggered = await self.service.get_triggered_alerts()
+            if not triggered:
+                return
+
+            triggered_by_channel = defaultdict(list)
+            for alert, price in triggered:
+                triggered_by_channel[alert.channel_id].append((alert, price))
+            sent = await asyncio.gather(
+                *(self.send_channel_alerts(channel_id, alerts) for channel_id, alerts in triggered_by_channel.items())
+            )
+
+            # Only delivered alerts are removed, the rest stay indexed and fire again on the next check
+            alert_ids = [alert_id for channel_ids in sent for alert_id in channel_ids]
+            if alert_ids:
+                await self.service.delete_alerts(alert_ids)
+                logging.info(f"Price alerts delivered: {alert_ids}")
+        except Exception as e:
+            logging.error(f"Error checking price alerts: {e}", exc_info=True)
+            mark_failed()
+
+    async def send_channel_alerts(self, channel_id, alerts):
+        """Send a channel's triggered alerts, returning the ids of the ones that were delivered."""
+        try:
+            channel = self.bot.get_channel(int(channel_id)) or await self.bot.fetch_channel(int(channel_id))
+        except Exception as e:
+            logging.error(f"Error fetching channel {channel_id} for {len(alerts)} price alerts: {e}")
+            return []
+
+        sent = []
+        for alert, price in alerts:
+            try:
+                await channel.send(f"<@{alert.user_id}> :chart: {describe_alert(alert)}, now {format_money(price)}")
+            except Exception as e:
+                logging.error(f"Error sending price alert {alert.id}: {e}")
+            else:
+                sent.append(alert.id)
+        return sent
+
+    @check_alerts.before_loop
+    async def before_check(self):
+        await self.bot.wait_until_ready()
+        await self.service.load()
+
+    @check_alerts.error
+    async def check_alerts_error(self, error):
+        logging.error(f"Error checking price alerts: {error}")
+
+    async def _create_alert(self, ctx, asset_type, search, condition):
+        await ctx.defer()
+        alert = await self.service.create_alert(
+            ctx.author.id, ctx.guild_id, ctx.channel_id, asset_type, search, condition
+        )
+        await ctx.followup.send(f"Alert set: {describe_alert(alert)}")
+
+    @alerts.command(name="stock", description="Get pinged when a stock crosses a price or moves a percent")
+    async def stock_alert(
+        self,
+        ctx,
+        ticker: Option(str, "Ticker to watch"),
+        condition: Option(str, "e.g. '< 150', '> 200' or 'moves 5%'"),
+    ):
+        await self._create_alert(ctx, AssetType.stock, ticker, condition)
+
+    @alerts.command(name="crypto", description="Get pinged when a coin crosses a price or moves a percent")
+    async def crypto_alert(
+        self,
+        ctx,
+        search_term: Option(str, "Coin id or symbol to watch"),
+        condition: Option(str, "e.g. '< 150', '> 200' or 'moves 5%'"),
+    ):
+        await self._create_alert(ctx, AssetType.crypto, search_term, condition)
+
+    @alerts.command(name="mine", description="List your price alerts in this server")
+    async def my_alerts(self, ctx):
+        await ctx.defer(ephemeral=True)
+        alerts = await self.service.get_user_alerts(ctx.author.id, ctx.guild_id)
+        if not alerts:
+            await ctx.followup.send("You have no price alerts in this server.", ephemeral=True)
+            return
+
+        response = f"**Your Price Alerts ({len(alerts)}):**\n"
+        response += "\n".join(f"`{alert.id}` {describe_alert(alert)}" for alert in alerts)
+        await ctx.followup.send(response, ephemeral=True)
+
+    @alerts.command(name="remove", description="Remove one of your price alerts")
+    async def remove_alert(self, ctx, alert_id: Option(int, "Alert id, from /alerts mine")):
+        removed = await self.service.delete_alert(alert_id, ctx.author.id, ctx.guild_id)
+        message = "Alert removed" if removed else "You don't have an alert with that id"
+        await ctx.respond(message, ephemeral=True)
+
+    async def cog_command_error(self, ctx, error):
+        logging.error(f"Alerts Error: {error}")
+        original_error = getattr(error, "original", error)
+        if isinstance(original_error, (InvalidParameter, NotFound)):
+            message = str(original_error)
+        else:
+            message = f"Alerts Error: {original_error}"
+        await ctx.respond(message, ephemeral=True)
+
+
+def setup(bot):
+    bot.add_cog(Alerts(bot))
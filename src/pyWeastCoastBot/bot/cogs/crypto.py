@@ -1,28 +1,94 @@
+import asyncio
+import io
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 import attr
-from discord import Colour, Embed, File, Option, slash_command
-from discord.ext import commands
+from discord import AutocompleteContext, Colour, Embed, File, Option, OptionChoice, slash_command
+from discord.ext import commands, tasks
 
 from pyWeastCoastBot.lib.crypto.cg import CoinGeckoClient
+from pyWeastCoastBot.lib.crypto.crypto_currencies import CryptoCurrencies
+from pyWeastCoastBot.lib.crypto.crypto_ranges import CryptoRanges
+from pyWeastCoastBot.utils.chart_renderer import ChartRenderer
 from pyWeastCoastBot.utils.errors import NotFound
+from pyWeastCoastBot.utils.metrics import instrument_task, mark_failed, stage
 from pyWeastCoastBot.utils.string import format_money, format_percent
 
 client = CoinGeckoClient()
+# pycoingecko is blocking, so fetches run here to keep the event loop free
+fetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="crypto_fetch")
+
+
+def coin_autocomplete(ctx: AutocompleteContext):
+    # Served from the in-memory coin index, the refresh loop loads it at startup
+    if not client.registry.is_loaded:
+        return []
+    index = client.registry.index
+    matches = index.prefix_matches(ctx.value or "") or index.fuzzy_matches(ctx.value)
+    return [OptionChoice(name=f"{coin.symbol.upper()} - {coin.name}"[:100], value=coin.id) for coin in matches]
 
 
 class Crypto(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.refresh_coins.start()
+
+    def cog_unload(self):
+        self.refresh_coins.cancel()
+
+    @tasks.loop(hours=1)
+    @instrument_task
+    async def refresh_coins(self):
+        try:
+            await client.registry.ensure_loaded()
+            if client.registry.is_stale:
+                await client.registry.refresh()
+        except Exception as e:
+            # Keep serving the stored list, the next iteration tries again
+            logging.error(f"Error refreshing CoinGecko coin list: {e}")
+            mark_failed()
 
-    @slash_command(description="Crypto coin price summary over the last 24hrs")
-    async def crypto(self, ctx, search_term: Option(str, "Search term")):
+    @refresh_coins.before_loop
+    async def before_refresh(self):
+        await self.bot.wait_until_ready()
+
+    @slash_command(description="Crypto coin price summary and chart")
+    async def crypto(
+        self,
+        ctx,
+        search_term: Option(str, "Search term", autocomplete=coin_autocomplete),
+        price_range: Option(
+            CryptoRanges,
+            "Chart range",
+            name="range",
+            choices=[r for r in CryptoRanges],
+            default=CryptoRanges.one_day,
+        ),
+        currency: Option(
+            CryptoCurrencies,
+            "Currency",
+            choices=[c for c in CryptoCurrencies],
+            default=CryptoCurrencies.usd,
+        ),
+    ):
         await ctx.defer()
-        coin_id = client.lookup_coin_id(search_term)
-        coin = client.get_coin_market_data(coin_id)
-        price_chart = client.get_coin_price_graph_image(coin_id)
-        response = CryptoCoinResponse(coin=coin, price_chart=price_chart)
-        await ctx.followup.send(embed=response.to_embed(), file=response.price_chart_file)
+        loop = asyncio.get_running_loop()
+        with stage("fetch"):
+            coin_id = await client.lookup_coin_id(search_term)
+            coin, price_history = await asyncio.gather(
+                loop.run_in_executor(fetch_executor, client.get_coin_market_data, coin_id, currency.value),
+                loop.run_in_executor(
+                    fetch_executor, client.get_coin_price_history, coin_id, currency.value, price_range
+                ),
+            )
+        with stage("render"):
+            price_chart = await ChartRenderer.render(price_history.price_graph_payload)
+        response = CryptoCoinResponse(
+            coin=coin, price_history=price_history, price_range=price_range, price_chart=price_chart
+        )
+        with stage("upload"):
+            await ctx.followup.send(embed=response.to_embed(), file=response.price_chart_file)
 
     @crypto.error
     async def crypto_error(self, ctx, error):
@@ -36,11 +102,16 @@ class Crypto(commands.Cog):
 @attr.s
 class CryptoCoinResponse:
     coin = attr.ib()
+    price_history = attr.ib()
+    price_range = attr.ib()
     price_chart = attr.ib()
 
+    def _money(self, value):
+        return format_money(value, self.coin.market_data.currency)
+
     @property
     def price_chart_file(self):
-        return File(self.price_chart, filename="image.png")
+        return File(io.BytesIO(self.price_chart), filename="image.png")
 
     @property
     def _color(self):
@@ -50,7 +121,7 @@ class CryptoCoinResponse:
         embed = Embed(title=self.coin.name, url=self.coin.home_page_url, color=self._color)
         embed.set_image(url="attachment://image.png")
         embed.set_thumbnail(url=self.coin.symbol_image_url)
-        embed.add_field(name="Price", value=format_money(self.coin.market_data.current_price), inline=True)
+        embed.add_field(name="Price", value=self._money(self.coin.market_data.current_price), inline=True)
         embed.add_field(
             name="Percent Change",
             value=format_percent(self.coin.market_data.price_change_percentage_24h),
@@ -58,21 +129,27 @@ class CryptoCoinResponse:
         )
         embed.add_field(
             name="Absolute Change",
-            value=format_money(self.coin.market_data.price_change_24h),
+            value=self._money(self.coin.market_data.price_change_24h),
             inline=True,
         )
         embed.add_field(
             name="24 Hour High",
-            value=format_money(self.coin.market_data.price_high_24h),
+            value=self._money(self.coin.market_data.price_high_24h),
             inline=True,
         )
         embed.add_field(
             name="24 Hour Low",
-            value=format_money(self.coin.market_data.price_low_24h),
+            value=self._money(self.coin.market_data.price_low_24h),
             inline=True,
         )
         embed.add_field(name="Volume", value=self.coin.market_data.total_volume, inline=True)
         embed.add_field(name="Market Cap Rank", value=self.coin.market_data.market_cap_rank, inline=True)
+        if self.price_range != CryptoRanges.one_day:
+            embed.add_field(
+                name=f"{self.price_range.value} Change",
+                value=format_percent(self.price_history.change_percentage),
+                inline=True,
+            )
         return embed
 
 
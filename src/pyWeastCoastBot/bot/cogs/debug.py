@@ -0,0 +1,81 @@
+import time
+
+from discord import Colour, Embed, Permissions
+from discord.commands import SlashCommandGroup
+from discord.ext import commands
+from humanize import naturaldelta
+
+from pyWeastCoastBot.lib.crypto.cg import CoinGeckoClient
+from pyWeastCoastBot.lib.omdb.client import OmdbClient
+from pyWeastCoastBot.lib.stonk.stonk_service import StonkService
+from pyWeastCoastBot.utils.chart_renderer import ChartRenderer
+from pyWeastCoastBot.utils.lazy_import import current_rss_bytes
+from pyWeastCoastBot.utils.metrics import RUN_SECONDS, UPSTREAM_SECONDS, summarize
+
+# Embed field values are capped at 1024 characters
+FIELD_LIMIT = 1024
+
+
+def format_summary(summary):
+    """Code block table of a metrics summary, busiest first."""
+    if not summary:
+        return "No data yet"
+    rows = sorted(summary.items(), key=lambda item: item[1][0], reverse=True)
+    names = [" ".join(group) for group, _ in rows]
+    width = max(len(name) for name in names)
+    lines = [f"{'':<{width}}{'calls':>7}{'errors':>7}{'avg ms':>8}"]
+    for name, (_, (count, errors, mean)) in zip(names, rows):
+        lines.append(f"{name:<{width}}{count:>7}{errors:>7}{mean * 1000:>8.0f}")
+    return code_block(lines)
+
+
+def format_cache_stats(caches):
+    lines = [f"{'':<20}{'hits':>7}{'misses':>7}{'rate':>6}"]
+    for name, stats in caches.items():
+        lines.append(f"{name:<20}{stats['hits']:>7}{stats['misses']:>7}{stats['hit_rate']:>6.2f}")
+    return code_block(lines)
+
+
+def code_block(lines):
+    # Drop rows that would run past the field limit rather than cut one in half
+    while len(lines) > 1 and sum(len(line) + 1 for line in lines) + 8 > FIELD_LIMIT:
+        lines = lines[:-1]
+    return "```\n" + "\n".join(lines) + "\n```"
+
+
+class Debug(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    debug = SlashCommandGroup(
+        "debug", "Bot diagnostics", guild_only=True, default_member_permissions=Permissions(administrator=True)
+    )
+
+    @debug.command(name="stats", description="Command latency, upstream API calls and cache hit rates")
+    async def stats(self, ctx):
+        runs = summarize(RUN_SECONDS, ("kind", "name"))
+        caches = {f"stonk {name}": stats for name, stats in StonkService.cache_stats().items()}
+        caches.update({f"crypto {name}": stats for name, stats in CoinGeckoClient.cache_stats().items()})
+        caches["charts"] = ChartRenderer.cache_stats()
+        caches["omdb"] = OmdbClient.cache.stats_summary
+
+        embed = Embed(title="Bot Stats", color=Colour.blurple())
+        for kind, title in (("command", "Commands"), ("task", "Tasks")):
+            summary = {group[1:]: values for group, values in runs.items() if group[0] == kind}
+            embed.add_field(name=title, value=format_summary(summary), inline=False)
+        embed.add_field(
+            name="Upstream APIs",
+            value=format_summary(summarize(UPSTREAM_SECONDS, ("service", "operation"))),
+            inline=False,
+        )
+        embed.add_field(name="Caches", value=format_cache_stats(caches), inline=False)
+
+        footer = f"RSS {current_rss_bytes() / 2**20:.0f} MiB"
+        if self.bot.started_at is not None:
+            footer += f", up {naturaldelta(time.perf_counter() - self.bot.started_at)}"
+        embed.set_footer(text=footer)
+        await ctx.respond(embed=embed, ephemeral=True)
+
+
+def setup(bot):
+    bot.add_cog(Debug(bot))
@@ -1,4 +1,5 @@
 import datetime
+import io
 import logging
 
 from discord import Colour, Embed, File, TextChannel
@@ -6,10 +7,13 @@ from discord.commands import SlashCommandGroup
 from discord.ext import commands, tasks
 from discord.ui import InputText, Modal, View, button
 
+from pyWeastCoastBot.bot.member_names import MemberNameResolver
+from pyWeastCoastBot.lib.fitbot.config import FitbotConfig
 from pyWeastCoastBot.lib.fitbot.service import FitbotService, GuildWeeklyStats
+from pyWeastCoastBot.utils.chart_renderer import ChartRenderer, LinePlotPayload
 from pyWeastCoastBot.utils.consts import HexColors
 from pyWeastCoastBot.utils.errors import InvalidParameter
-from pyWeastCoastBot.utils.graph import generate_line_plot_image
+from pyWeastCoastBot.utils.metrics import instrument_task, mark_failed, stage
 from pyWeastCoastBot.utils.types import hex_to_rgb
 
 
@@ -17,11 +21,14 @@ class Fitbot(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.fitbot = FitbotService()
+        self.member_names = MemberNameResolver(bot)
         self.post_leaderboard.start()
+        self.refresh_tokens.start()
         logging.info("Fitbot cog started")
 
     def cog_unload(self):
         self.post_leaderboard.cancel()
+        self.refresh_tokens.cancel()
 
     fitbot = SlashCommandGroup("fitbot", "Fitbit integration commands", guild_only=True)
 
@@ -54,22 +61,24 @@ class Fitbot(commands.Cog):
         await ctx.respond("You've been disconnected from Fitbot", ephemeral=True)
 
     async def _get_weekly_leaderboard_response(self, guild_id):
-        stats = await self.fitbot.get_guild_weekly_stats(guild_id)
-        user_id_to_username = {}
-        for user_id in stats.user_ids:
-            user = await self.bot.fetch_user(int(user_id))
-            if user and user.name:
-                user_id_to_username[user_id] = user.display_name
-        return WeeklyLeaderboardResponse(stats, user_id_to_username)
+        with stage("fetch"):
+            stats = await self.fitbot.get_guild_weekly_stats(guild_id)
+            user_id_to_username = await self.member_names.resolve(guild_id, stats.user_ids)
+        response = WeeklyLeaderboardResponse(stats, user_id_to_username)
+        with stage("render"):
+            await response.render_chart()
+        return response
 
     @fitbot.command(name="leaderboard", description="Weekly fitbit stats")
     async def fitbot_leaderboard(self, ctx):
         guild_id = ctx.guild_id
         await ctx.defer()
         response = await self._get_weekly_leaderboard_response(guild_id)
-        await ctx.followup.send(embed=response.to_embed(), file=response.image_file)
+        with stage("upload"):
+            await ctx.followup.send(embed=response.to_embed(), file=response.image_file)
 
     @tasks.loop(time=datetime.time(19))
+    @instrument_task
     async def post_leaderboard(self):
         logging.info("Posting fitbot leaderboards")
         guild_ids = await self.fitbot.get_registered_guild_ids()
@@ -78,11 +87,14 @@ class Fitbot(commands.Cog):
             guild = await self.bot.fetch_guild(int(guild_id))
             channels = await guild.fetch_channels()
             logging.info(f"Guild id: {guild_id}, channels: {channels}")
+            response = None
             for channel in channels:
                 if isinstance(channel, TextChannel) and "fitbot" in channel.name:
                     logging.info(f"Posting to guild {guild.name}, channel {channel.name}")
-                    response = await self._get_weekly_leaderboard_response(guild_id)
-                    await channel.send(embed=response.to_embed(), file=response.image_file)
+                    # Stats are shared across every fitbot channel in the guild
+                    response = response or await self._get_weekly_leaderboard_response(guild_id)
+                    with stage("upload"):
+                        await channel.send(embed=response.to_embed(), file=response.image_file)
 
     @post_leaderboard.before_loop
     async def before_poll(self):
@@ -92,6 +104,16 @@ class Fitbot(commands.Cog):
     async def post_leaderboard_error(self, error):
         logging.info(f"Error occurred while posting fitbot leaderboard: {error}")
 
+    @tasks.loop(seconds=FitbotConfig.token_refresh_interval.total_seconds())
+    @instrument_task
+    async def refresh_tokens(self):
+        # An uncaught error would stop the loop, leaving tokens to expire
+        try:
+            await self.fitbot.refresh_expiring_tokens()
+        except Exception as e:
+            logging.error(f"Error refreshing fitbit tokens: {e}", exc_info=True)
+            mark_failed()
+
 
 class RegistrationView(View):
     def __init__(self, fitbot) -> None:
@@ -130,6 +152,7 @@ class WeeklyLeaderboardResponse:
     def __init__(self, guild_stats: GuildWeeklyStats, user_id_map):
         self.guild_stats = guild_stats
         self.user_id_map = user_id_map
+        self.chart = None
 
     @property
     def color(self):
@@ -162,21 +185,25 @@ class WeeklyLeaderboardResponse:
         return "https://icon-library.com/images/fitbit-icon/fitbit-icon-20.jpg"
 
     @property
-    def image_file(self):
+    def chart_payload(self):
         df = self.guild_stats.steps_df
-        renamed_df = df.rename(columns=lambda c: self.user_id_map.get(str(c), str(c)))
-        return File(
-            generate_line_plot_image(
-                renamed_df,
-                x=renamed_df.index,
-                y=list(renamed_df.columns),
-                xlabel="Date",
-                ylabel="Steps",
-                legend_title="Users",
-            ),
-            filename="image.png",
+        return LinePlotPayload.from_dataframe(
+            df,
+            x=df.index,
+            y=list(df.columns),
+            xlabel="Date",
+            ylabel="Steps",
+            legend_title="Users",
+            labels={c: self.user_id_map.get(str(c), str(c)) for c in df.columns},
         )
 
+    async def render_chart(self):
+        self.chart = await ChartRenderer.render(self.chart_payload)
+
+    @property
+    def image_file(self):
+        return File(io.BytesIO(self.chart), filename="image.png")
+
     def to_embed(self):
         embed = Embed(title="Fitbit Leaderboard", description=self.description, color=self.color)
         embed.set_thumbnail(url=self.thumbnail_image_url)
@@ -6,6 +6,7 @@ from discord.ext import commands
 from pyWeastCoastBot.lib.omdb.client import OmdbClient
 from pyWeastCoastBot.lib.omdb.imdb_file import ImdbFilm
 from pyWeastCoastBot.utils.errors import InvalidParameter
+from pyWeastCoastBot.utils.metrics import stage
 
 
 class IMDB(commands.Cog):
@@ -25,9 +26,11 @@ class IMDB(commands.Cog):
         if not (title_search_text or imdb_id):
             raise InvalidParameter("title or IMDb ID required")
         await ctx.defer()
-        film = self.omdb_client.find_by_title_or_id(title=title_search_text, imdb_id=imdb_id, year=year)
+        with stage("fetch"):
+            film = await self.omdb_client.find_by_title_or_id(title=title_search_text, imdb_id=imdb_id, year=year)
         logging.info(f"Found IMDB entry for search title={title_search_text},imdb_id={imdb_id}, year={year}: {film}")
-        await ctx.followup.send(embed=self.embed_from_film(film))
+        with stage("upload"):
+            await ctx.followup.send(embed=self.embed_from_film(film))
 
     @imdb.error
     async def imdb_error(self, ctx, error):
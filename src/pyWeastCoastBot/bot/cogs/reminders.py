@@ -1,23 +1,29 @@
+import asyncio
 import logging
+from collections import defaultdict
+from datetime import timedelta
 
 from discord import Option, slash_command
 from discord.commands import SlashCommandGroup
 from discord.ext import commands, tasks
 from humanize import naturaltime
-from sqlmodel import select
+from sqlmodel import delete, select
 
 from pyWeastCoastBot.db.models import Reminder
 from pyWeastCoastBot.db.session import get_session
+from pyWeastCoastBot.lib.reminders.scheduler import ReminderScheduler
+from pyWeastCoastBot.utils.metrics import instrument_task, mark_failed, stage
 from pyWeastCoastBot.utils.time import parse_utc_datetime, utc_now
 
 
 class Reminders(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.poll_for_reminder.start()
+        self.scheduler = ReminderScheduler()
+        self.deliver_reminders.start()
 
     def cog_unload(self):
-        self.poll_for_reminder.cancel()
+        self.deliver_reminders.cancel()
 
     reminders = SlashCommandGroup("reminders", "View reminders")
 
@@ -47,36 +53,70 @@ class Reminders(commands.Cog):
             response += "\n\n"
         return response
 
-    @tasks.loop(seconds=30)
-    async def poll_for_reminder(self):
+    @tasks.loop()
+    async def deliver_reminders(self):
+        await self.scheduler.wait_until_due()
+        await self.deliver_due_reminders()
+
+    @instrument_task
+    async def deliver_due_reminders(self):
         try:
             async for session in get_session():
-                stmt = select(Reminder).where(Reminder.remind_time <= utc_now())
-                result = await session.exec(stmt)
-                reminders = result.all()
-
+                stmt = select(Reminder).where(Reminder.remind_time <= utc_now()).order_by(Reminder.remind_time)
+                with stage("db"):
+                    result = await session.exec(stmt)
+                    reminders = result.all()
+                if not reminders:
+                    return
+
+                reminders_by_channel = defaultdict(list)
                 for reminder in reminders:
-                    logging.info(f"Handling reminder {reminder}")
-                    try:
-                        channel = await self.bot.fetch_channel(int(reminder.channel_id))
-
-                        message = f"<@{reminder.user_id}> :alarm_clock: Here's your reminder!"
-                        if reminder.message:
-                            message += f"\n> {reminder.message}"
+                    reminders_by_channel[reminder.channel_id].append(reminder)
+                await asyncio.gather(
+                    *(
+                        self.send_channel_reminders(channel_id, channel_reminders)
+                        for channel_id, channel_reminders in reminders_by_channel.items()
+                    )
+                )
+
+                reminder_ids = [reminder.id for reminder in reminders]
+                with stage("db"):
+                    await session.exec(delete(Reminder).where(Reminder.id.in_(reminder_ids)))
+                    await session.commit()
+                logging.info(f"Reminders Deleted: {reminder_ids}")
+        except Exception as e:
+            logging.error(f"Error delivering reminders: {e}")
+            mark_failed()
+            # Due rows are still in the database, so try again shortly
+            self.scheduler.schedule(utc_now() + timedelta(seconds=self.scheduler.retry_seconds))
 
-                        await channel.send(message)
-                    except Exception as e:
-                        logging.error(f"Error handling reminder: {e}")
+    async def send_channel_reminders(self, channel_id, reminders):
+        """Send a channel's due reminders, in order, resolving the channel once.
 
-                    await session.delete(reminder)
-                    logging.info(f"Reminder Deleted: {reminder}")
-                await session.commit()
+        Args:
+            channel_id: Discord channel ID the reminders were set in
+            reminders: Due Reminder objects for the channel, oldest first
+        """
+        try:
+            channel = self.bot.get_channel(int(channel_id)) or await self.bot.fetch_channel(int(channel_id))
         except Exception as e:
-            logging.error(f"Error polling reminders: {e}")
+            logging.error(f"Error fetching channel {channel_id} for {len(reminders)} reminders: {e}")
+            return
 
-    @poll_for_reminder.before_loop
-    async def before_poll(self):
+        for reminder in reminders:
+            logging.info(f"Handling reminder {reminder}")
+            message = f"<@{reminder.user_id}> :alarm_clock: Here's your reminder!"
+            if reminder.message:
+                message += f"\n> {reminder.message}"
+            try:
+                await channel.send(message)
+            except Exception as e:
+                logging.error(f"Error handling reminder: {e}")
+
+    @deliver_reminders.before_loop
+    async def before_deliver(self):
         await self.bot.wait_until_ready()
+        await self.scheduler.load()
 
     @slash_command(description="Set a reminder - recommended to specify timezone")
     async def remind_me(
@@ -100,11 +140,13 @@ class Reminders(commands.Cog):
             remind_time=reminder_datetime,
         )
 
-        async for session in get_session():
-            session.add(reminder)
-            await session.commit()
-            await session.refresh(reminder)
+        with stage("db"):
+            async for session in get_session():
+                session.add(reminder)
+                await session.commit()
+                await session.refresh(reminder)
 
+        self.scheduler.schedule(reminder.remind_time)
         logging.info(f"Reminder created: {reminder}")
 
         response_message = f"Reminder set for ~{self.format_remind_time(reminder.remind_time)}"
@@ -132,8 +174,9 @@ class Reminders(commands.Cog):
                 .where(Reminder.guild_id == str(ctx.guild_id))
                 .order_by(Reminder.remind_time)
             )
-            result = await session.exec(stmt)
-            reminders = result.all()
+            with stage("db"):
+                result = await session.exec(stmt)
+                reminders = result.all()
 
         if not reminders:
             await ctx.followup.send("You have no active reminders in this server.", ephemeral=True)
@@ -151,8 +194,9 @@ class Reminders(commands.Cog):
 
         async for session in get_session():
             stmt = select(Reminder).where(Reminder.guild_id == str(ctx.guild_id)).order_by(Reminder.remind_time)
-            result = await session.exec(stmt)
-            reminders = result.all()
+            with stage("db"):
+                result = await session.exec(stmt)
+                reminders = result.all()
 
         if not reminders:
             await ctx.followup.send("There are no active reminders in this server.")
@@ -1,18 +1,34 @@
+import asyncio
+import io
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 import attr
-from discord import Colour, Embed, File, Option, slash_command
+from discord import AutocompleteContext, Colour, Embed, File, Option, OptionChoice, slash_command
 from discord.ext import commands
 
 from pyWeastCoastBot.lib.stonk.stonk_intervals import StonkIntervals
 from pyWeastCoastBot.lib.stonk.stonk_periods import StonkPeriods
 from pyWeastCoastBot.lib.stonk.stonk_service import StonkService
+from pyWeastCoastBot.lib.stonk.tickers import ticker_index
+from pyWeastCoastBot.utils.chart_renderer import ChartRenderer
 from pyWeastCoastBot.utils.consts import STONKMAN_DOWN_URL, STONKMAN_UP_URL
-from pyWeastCoastBot.utils.errors import NotFound
+from pyWeastCoastBot.utils.errors import InvalidParameter, NotFound
+from pyWeastCoastBot.utils.metrics import stage
 from pyWeastCoastBot.utils.string import format_money, format_percent
 from pyWeastCoastBot.utils.time import is_same_day
 
 service = StonkService()
+# yfinance is blocking, so fetches run here to keep the event loop free
+fetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="stonk_fetch")
+
+
+def ticker_autocomplete(ctx: AutocompleteContext):
+    matches = ticker_index().matches(ctx.value or "")
+    if not matches and ctx.value:
+        # The bundled list is only the popular tickers, anything else yfinance knows still works
+        return [ctx.value.strip().upper()[:100]]
+    return [OptionChoice(name=f"{ticker.symbol} - {ticker.name}"[:100], value=ticker.symbol) for ticker in matches]
 
 
 class Stonk(commands.Cog):
@@ -23,7 +39,7 @@ class Stonk(commands.Cog):
     async def stonk(
         self,
         ctx,
-        ticker: Option(str, "Ticker to look up"),
+        ticker: Option(str, "Ticker to look up", autocomplete=ticker_autocomplete),
         period: Option(StonkPeriods, "Period", choices=[p for p in StonkPeriods], default=StonkPeriods.one_day),
         interval: Option(
             StonkIntervals,
@@ -34,10 +50,17 @@ class Stonk(commands.Cog):
     ):
         await ctx.defer()
         logging.info(f"Fetching stonk data for {ticker}")
-        stock_info = service.get_stock_info(ticker)
-        stock_history = service.get_stock_history(ticker, period, interval)
-        response = StonkResponse(stock_info, stock_history)
-        await ctx.followup.send(embed=response.to_embed(), file=response.price_chart_file)
+        loop = asyncio.get_running_loop()
+        with stage("fetch"):
+            stock_info, stock_history = await asyncio.gather(
+                loop.run_in_executor(fetch_executor, service.get_stock_info, ticker),
+                loop.run_in_executor(fetch_executor, service.get_stock_history, ticker, period, interval),
+            )
+        with stage("render"):
+            price_chart = await ChartRenderer.render(stock_history.price_graph_payload)
+        response = StonkResponse(stock_info, stock_history, price_chart)
+        with stage("upload"):
+            await ctx.followup.send(embed=response.to_embed(), file=response.price_chart_file)
 
     @stonk.error
     async def stonk_error(self, ctx, error):
@@ -47,15 +70,50 @@ class Stonk(commands.Cog):
             message = ("Could not find stonk",)
         await ctx.respond(message, ephemeral=True)
 
+    @slash_command(name="stonk_compare", description="Compare how several stocks moved over a period")
+    async def stonk_compare(
+        self,
+        ctx,
+        tickers: Option(str, "Tickers to compare, separated by spaces or commas"),
+        period: Option(StonkPeriods, "Period", choices=[p for p in StonkPeriods], default=StonkPeriods.one_month),
+        interval: Option(
+            StonkIntervals,
+            "Interval",
+            choices=[i for i in StonkIntervals],
+            default=StonkIntervals.one_day,
+        ),
+    ):
+        await ctx.defer()
+        logging.info(f"Comparing stonks {tickers}")
+        loop = asyncio.get_running_loop()
+        with stage("fetch"):
+            comparison = await loop.run_in_executor(
+                fetch_executor, service.get_stock_comparison, tickers, period, interval
+            )
+        with stage("render"):
+            price_chart = await ChartRenderer.render(comparison.price_graph_payload)
+        response = StonkComparisonResponse(comparison, price_chart)
+        with stage("upload"):
+            await ctx.followup.send(embed=response.to_embed(), file=response.price_chart_file)
+
+    @stonk_compare.error
+    async def stonk_compare_error(self, ctx, error):
+        logging.error(f"Stonk Compare Error: {error}")
+        message = f"Stonk Compare Error: {error.original}"
+        if isinstance(error.original, (InvalidParameter, NotFound)):
+            message = str(error.original)
+        await ctx.respond(message, ephemeral=True)
+
 
 @attr.s
 class StonkResponse:
     stock_info = attr.ib()
     stock_history = attr.ib()
+    price_chart = attr.ib()
 
     @property
     def price_chart_file(self):
-        return File(self.stock_history.price_graph_image, filename="image.png")
+        return File(io.BytesIO(self.price_chart), filename="image.png")
 
     @property
     def _dates(self):
@@ -137,5 +195,54 @@ class StonkResponse:
         return embed
 
 
+@attr.s
+class StonkComparisonResponse:
+    comparison = attr.ib()
+    price_chart = attr.ib()
+
+    @property
+    def price_chart_file(self):
+        return File(io.BytesIO(self.price_chart), filename="image.png")
+
+    @property
+    def _title(self):
+        return f"Stonk Comparison: {', '.join(self.comparison.symbols)}"
+
+    @property
+    def _dates(self):
+        start = self.comparison.start_date
+        end = self.comparison.end_date
+        if is_same_day(start, end):
+            return f"{start:%m/%d/%Y, %I:%M %p} - {end:%I:%M %p}"
+        return f"{start:%m/%d/%Y, %H:%M} - {end:%m/%d/%Y, %H:%M}"
+
+    @property
+    def _summary_table(self):
+        # Best performer first
+        rows = sorted(self.comparison.symbols, key=self.comparison.changes.get, reverse=True)
+        width = max(len(symbol) for symbol in rows)
+        lines = [
+            f"{symbol:<{width}}  {format_money(self.comparison.last_closes[symbol]):>12}  "
+            f"{'+' if self.comparison.changes[symbol] >= 0 else ''}{format_percent(self.comparison.changes[symbol])}"
+            for symbol in rows
+        ]
+        return "```\n" + "\n".join(lines) + "\n```"
+
+    @property
+    def _color(self):
+        if sum(self.comparison.changes.values()) < 0:
+            return Colour.red()
+        else:
+            return Colour.green()
+
+    def to_embed(self):
+        embed = Embed(title=self._title, description=self._summary_table, color=self._color)
+        embed.set_image(url="attachment://image.png")
+        embed.add_field(name="When", value=self._dates, inline=False)
+        if self.comparison.missing:
+            embed.add_field(name="No data for", value=", ".join(self.comparison.missing), inline=False)
+        return embed
+
+
 def setup(bot):
     bot.add_cog(Stonk(bot))
@@ -1,12 +1,14 @@
 import logging
 
-import requests
 from discord import Option, slash_command
 from discord.ext import commands
 
+from pyWeastCoastBot.lib.http.client import HttpClient
+
 
 class Wiki(commands.Cog):
-    wiki_search_url = "https://en.wikipedia.org/w/api.php?action=opensearch&limit=1&namespace=0&format=json&search="
+    wiki_search_url = "https://en.wikipedia.org/w/api.php"
+    wiki_search_params = dict(action="opensearch", limit=1, namespace=0, format="json")
 
     def __init__(self, bot):
         self.bot = bot
@@ -14,16 +16,16 @@ class Wiki(commands.Cog):
     @slash_command(description="Search for wikipedia links")
     async def wiki(self, ctx, search_text: Option(str, "Title search term")):
         await ctx.defer()
-        link = self.search_wiki_articles(search_text)
+        link = await self.search_wiki_articles(search_text)
         if not link:
             await ctx.followup.send(f"Sorry, couldn't find article for '{search_text}'", ephemeral=True)
             return
         await ctx.followup.send(link)
 
     @classmethod
-    def search_wiki_articles(cls, search_text):
-        url = cls.wiki_search_url + search_text
-        res = requests.get(url).json()
+    async def search_wiki_articles(cls, search_text):
+        params = dict(cls.wiki_search_params, search=search_text)
+        res = await HttpClient.get_json(cls.wiki_search_url, params=params, service="wikipedia", operation="opensearch")
         try:
             link = res[3][0]
             return link
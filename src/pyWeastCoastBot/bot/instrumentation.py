@@ -0,0 +1,44 @@
+import time
+
+import discord
+
+from pyWeastCoastBot.utils.metrics import FIRST_RESPONSE_SECONDS
+
+# Option types of subcommands and subcommand groups in interaction data
+SUBCOMMAND_OPTION_TYPES = (1, 2)
+
+
+def full_command_name(ctx):
+    """Qualified name of the invoked command including subcommands, known before the group resolves them."""
+    data = ctx.interaction.data or {}
+    names = [data.get("name") or ctx.command.qualified_name]
+    options = data.get("options", [])
+    while options and options[0].get("type") in SUBCOMMAND_OPTION_TYPES:
+        names.append(options[0]["name"])
+        options = options[0].get("options", [])
+    return " ".join(names)
+
+
+class InstrumentedContext(discord.ApplicationContext):
+    """Application context that records how long a command took to first defer or respond."""
+
+    def __init__(self, bot, interaction):
+        super().__init__(bot, interaction)
+        self.received_at = time.perf_counter()
+        self._first_response_recorded = False
+
+    def _record_first_response(self):
+        if self._first_response_recorded or self.command is None:
+            return
+        self._first_response_recorded = True
+        FIRST_RESPONSE_SECONDS.observe(time.perf_counter() - self.received_at, command=full_command_name(self))
+
+    @property
+    def defer(self):
+        self._record_first_response()
+        return self.interaction.response.defer
+
+    @property
+    def respond(self):
+        self._record_first_response()
+        return self.interaction.respond
@@ -1,15 +1,61 @@
+import asyncio
 import logging
+import time
 from pathlib import Path
 
 import discord
 
 import pyWeastCoastBot.config as config
+from pyWeastCoastBot.bot.instrumentation import InstrumentedContext, full_command_name
+from pyWeastCoastBot.lib.http.client import HttpClient
+from pyWeastCoastBot.utils.chart_renderer import ChartRenderer
+from pyWeastCoastBot.utils.lazy_import import current_rss_bytes, import_report, record_import, warm_up
+from pyWeastCoastBot.utils.metrics import MetricsServer, track_run
 
-bot = discord.Bot()
+
+class WeastCoastBot(discord.Bot):
+    started_at = None
+    warmed_up = False
+    metrics_server = None
+
+    async def start(self, *args, **kwargs):
+        await HttpClient.start()
+        if config.METRICS_PORT:
+            self.metrics_server = MetricsServer(config.METRICS_HOST, config.METRICS_PORT)
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                # A taken port shouldn't keep the bot from starting
+                logging.error(f"Could not serve metrics on {config.METRICS_HOST}:{config.METRICS_PORT}: {e}")
+                self.metrics_server = None
+        await super().start(*args, **kwargs)
+
+    async def close(self):
+        await HttpClient.close()
+        if self.metrics_server is not None:
+            await self.metrics_server.close()
+        ChartRenderer.close()
+        await super().close()
+
+    async def get_application_context(self, interaction, cls=InstrumentedContext):
+        return await super().get_application_context(interaction, cls=cls)
+
+    async def invoke_application_command(self, ctx):
+        with track_run("command", full_command_name(ctx)) as run:
+            await super().invoke_application_command(ctx)
+            # Command errors are dispatched to the error handlers rather than raised
+            run.failed = getattr(ctx, "command_failed", False)
+
+
+bot = WeastCoastBot()
 
 
 def run():
+    bot.started_at = time.perf_counter()
     load_cogs()
+    logging.info(
+        f"Cogs loaded in {time.perf_counter() - bot.started_at:.2f}s, RSS {current_rss_bytes() / 2**20:.0f} MiB"
+    )
     bot.run(config.BOT_TOKEN)
 
 
@@ -23,7 +69,8 @@ def load_cogs():
 
         cog_name = f"pyWeastCoastBot.bot.cogs.{file.stem}"
         try:
-            bot.load_extension(cog_name)
+            with record_import(cog_name):
+                bot.load_extension(cog_name)
             logging.info(f"Registered Cog: {cog_name}")
         except Exception as e:
             logging.error(f"Failed to load extension {cog_name}.", exc_info=e)
@@ -32,3 +79,15 @@ def load_cogs():
 @bot.event
 async def on_ready():
     logging.info(f"I am {bot.user.name}.")
+    # on_ready fires again after every reconnect
+    if bot.started_at is None or bot.warmed_up:
+        return
+    bot.warmed_up = True
+    logging.info(
+        f"Ready {time.perf_counter() - bot.started_at:.2f}s after start, "
+        f"RSS {current_rss_bytes() / 2**20:.0f} MiB, slowest imports:\n{import_report()}"
+    )
+    if config.WARM_UP_IMPORTS:
+        # Heavy dependencies were left for first use, import them off the event loop now that commands work
+        await asyncio.get_running_loop().run_in_executor(None, warm_up)
+        logging.info(f"Warm up done, RSS {current_rss_bytes() / 2**20:.0f} MiB")
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+
+from pyWeastCoastBot.utils.cache import TTLCache
+
+
+class MemberNameResolver:
+    """Display names for a guild's user ids, with as few Discord API calls as possible.
+
+    Names come from a TTL cache, then the gateway's member and user caches.
+    Only the ids none of those know about go to Discord, as one gateway member
+    query per 100 ids. Users no longer in the guild fall back to a REST lookup.
+    """
+
+    # Discord's limit on user ids per member query
+    query_batch_size = 100
+
+    def __init__(self, bot, ttl_seconds=60 * 60, max_entries=10_000):
+        self.bot = bot
+        # (guild_id, user_id) -> display name, keyed by guild since nicknames differ per guild
+        self._names = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    async def resolve(self, guild_id, user_ids):
+        """Map each user id to its display name, leaving out users Discord doesn't know.
+
+        Args:
+            guild_id: Guild whose nicknames to use
+            user_ids (list[str]): User ids to name
+
+        Returns:
+            dict: User id to display name
+        """
+        guild_id = int(guild_id)
+        guild = self.bot.get_guild(guild_id)
+        names = {}
+        missing = []
+        for user_id in user_ids:
+            name = self._names.get((guild_id, str(user_id)))
+            if name is None:
+                member = guild.get_member(int(user_id)) if guild else None
+                user = member or self.bot.get_user(int(user_id))
+                name = user.display_name if user else None
+            if name is None:
+                missing.append(str(user_id))
+            else:
+                names[str(user_id)] = name
+
+        if missing and guild:
+            names.update(await self._query_members(guild, missing))
+            missing = [user_id for user_id in missing if user_id not in names]
+        if missing:
+            names.update(await self._fetch_users(missing))
+
+        for user_id, name in names.items():
+            self._names.set((guild_id, user_id), name)
+        return names
+
+    async def _query_members(self, guild, user_ids):
+        names = {}
+        for i in range(0, len(user_ids), self.query_batch_size):
+            batch = [int(user_id) for user_id in user_ids[i : i + self.query_batch_size]]
+            try:
+                members = await guild.query_members(user_ids=batch, limit=len(batch), cache=True)
+            except Exception as e:
+                logging.error(f"Error querying {len(batch)} members of guild {guild.id}: {e}")
+                continue
+            names.update({str(member.id): member.display_name for member in members})
+        return names
+
+    async def _fetch_users(self, user_ids):
+        logging.info(f"Fetching {len(user_ids)} users not found in the gateway cache")
+        users = await asyncio.gather(
+            *(self.bot.fetch_user(int(user_id)) for user_id in user_ids), return_exceptions=True
+        )
+        names = {}
+        for user_id, user in zip(user_ids, users):
+            if isinstance(user, Exception):
+                logging.error(f"Error fetching user {user_id}: {user}")
+            else:
+                names[user_id] = user.display_name
+        return names
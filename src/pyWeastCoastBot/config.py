@@ -18,8 +18,16 @@ def get_bool(key: str, default: bool = False) -> bool:
     return value.lower() == "true"
 
 
+def get_int(key: str, default: int) -> int:
+    value = get(key)
+    if value is None:
+        return default
+    return int(value)
+
+
 # Configuration Constants
 OMDB_API_SECRET = get("OMDB_API_SECRET")
+OMDB_CACHE_PERSIST = get_bool("OMDB_CACHE_PERSIST", True)
 FITBIT_CLIENT_ID = get("FITBIT_CLIENT_ID")
 FITBIT_CLIENT_SECRET = get("FITBIT_CLIENT_SECRET")
 BOT_TOKEN = get("BOT_TOKEN")
@@ -28,6 +36,17 @@ LOGGING_FORMAT_TIME_ENABLED = get_bool("LOGGING_FORMAT_TIME_ENABLED", True)
 LOGGING_FORMAT_NAME_ENABLED = get_bool("LOGGING_FORMAT_NAME_ENABLED", True)
 LOGGING_FORMAT_LEVEL_ENABLED = get_bool("LOGGING_FORMAT_LEVEL_ENABLED", True)
 LOGGING_LEVEL = get("LOGGING_LEVEL", "INFO").upper()
+CHART_RENDER_WORKERS = get_int("CHART_RENDER_WORKERS", 2)
+COINGECKO_CALLS_PER_MINUTE = get_int("COINGECKO_CALLS_PER_MINUTE", 10)
+# Where fetched stock price history is kept between restarts, empty keeps it in memory only
+STONK_HISTORY_DIR = get(
+    "STONK_HISTORY_DIR", "/app/data/stonk_history" if os.path.exists("/app/data") else "stonk_history"
+)
+# Import heavy dependencies in the background once the bot is ready, rather than on first use
+WARM_UP_IMPORTS = get_bool("WARM_UP_IMPORTS", True)
+# Local Prometheus endpoint for command and upstream call metrics, port 0 turns it off
+METRICS_HOST = get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = get_int("METRICS_PORT", 9464)
 # Logging Configuration
 
 log_format = ""
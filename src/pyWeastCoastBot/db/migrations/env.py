@@ -7,7 +7,14 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 from sqlmodel import SQLModel
 
 # Import models so metadata is registered
-from pyWeastCoastBot.db.models import Reminder, ThirdPartyAuth  # noqa: F401
+from pyWeastCoastBot.db.models import (  # noqa: F401
+    CoinGeckoCoin,
+    FitbitDailyStat,
+    OmdbCacheEntry,
+    PriceAlert,
+    Reminder,
+    ThirdPartyAuth,
+)
 from pyWeastCoastBot.db.session import get_database_url
 
 # this is the Alembic Config object, which provides
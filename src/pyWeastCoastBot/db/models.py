@@ -1,11 +1,17 @@
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import Optional
 
-from sqlalchemy import Column, DateTime
+from sqlalchemy import Column, Date, DateTime, Index
 from sqlmodel import Field, SQLModel, UniqueConstraint
 
 
 class Reminder(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_reminder_remind_time", "remind_time"),
+        Index("ix_reminder_guild_id_remind_time", "guild_id", "remind_time"),
+        Index("ix_reminder_user_id_guild_id_remind_time", "user_id", "guild_id", "remind_time"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: str
     guild_id: str
@@ -25,6 +31,8 @@ class ThirdPartyAuth(SQLModel, table=True):
     user_id: str
     provider: str
     guild_id: str
+    # Account id on the provider's side, shared when a user registers in several guilds
+    provider_user_id: Optional[str] = Field(default=None)
     access_token: str
     refresh_token: str
     scope: str
@@ -33,3 +41,67 @@ class ThirdPartyAuth(SQLModel, table=True):
         default_factory=lambda: datetime.now(timezone.utc),
         sa_column=Column(DateTime(timezone=True), nullable=False),
     )
+
+
+class FitbitDailyStat(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("fitbit_user_id", "resource", "day"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    fitbit_user_id: str
+    resource: str
+    day: date = Field(sa_column=Column(Date, nullable=False))
+    value: str
+    fetched_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )
+
+
+class OmdbCacheEntry(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("query_key"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    query_key: str
+    imdb_id: str
+    response_json: str
+    fetched_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )
+
+
+class CoinGeckoCoin(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("coin_id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    coin_id: str
+    symbol: str
+    name: str
+    market_cap_rank: Optional[int] = Field(default=None)
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )
+
+
+class PriceAlert(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_pricealert_asset_type_symbol", "asset_type", "symbol"),
+        Index("ix_pricealert_user_id_guild_id", "user_id", "guild_id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: str
+    guild_id: str
+    channel_id: str
+    # "stock" or "crypto", symbol is the ticker or CoinGecko coin id
+    asset_type: str
+    symbol: str
+    # "above", "below", or "move" with threshold as a percent of reference_price
+    kind: str
+    threshold: float
+    reference_price: float
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )
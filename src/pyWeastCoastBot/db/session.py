@@ -1,10 +1,38 @@
 import os
 from pathlib import Path
 
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+# Set on every new SQLite connection. WAL lets the reminder poller and other
+# readers run while a command writes, NORMAL sync is still crash safe in WAL
+# mode, and busy_timeout makes a second writer wait instead of failing.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    # Negative cache_size is in KiB
+    "cache_size": -16 * 1024,
+    "mmap_size": 64 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
+POSTGRES_ENGINE_OPTIONS = dict(
+    pool_size=5,
+    max_overflow=5,
+    pool_timeout=10,
+    # Connections to a managed Postgres get dropped while the bot idles overnight
+    pool_pre_ping=True,
+    pool_recycle=30 * 60,
+    connect_args=dict(
+        # Prepared statements cached per connection, set to 0 behind pgbouncer in transaction mode
+        prepared_statement_cache_size=256,
+    ),
+)
+
 
 def get_database_url() -> str:
     database_url = os.environ.get("DATABASE_URL")
@@ -21,11 +49,35 @@ def get_database_url() -> str:
     return f"sqlite+aiosqlite:///{db_path}"
 
 
-engine: AsyncEngine = create_async_engine(
-    get_database_url(),
-    echo=False,
-    future=True,
-)
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {pragma}={value}")
+    cursor.close()
+
+
+def create_engine(database_url=None) -> AsyncEngine:
+    """Create an async engine tuned for its backend.
+
+    Args:
+        database_url: Defaults to the configured database
+
+    Returns:
+        AsyncEngine: SQLite engines set SQLITE_PRAGMAS on connect, Postgres
+        engines use POSTGRES_ENGINE_OPTIONS
+    """
+    database_url = database_url or get_database_url()
+    backend = make_url(database_url).get_backend_name()
+    if backend == "postgresql":
+        return create_async_engine(database_url, echo=False, future=True, **POSTGRES_ENGINE_OPTIONS)
+
+    engine = create_async_engine(database_url, echo=False, future=True)
+    if backend == "sqlite":
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+engine: AsyncEngine = create_engine()
 
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
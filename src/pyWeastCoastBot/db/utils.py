@@ -0,0 +1,21 @@
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+
+async def upsert(session, model, rows, index_elements, update_fields):
+    """Insert rows, updating the given fields of rows that already exist.
+
+    Args:
+        session: Session to execute in (not committed)
+        model: SQLModel table class
+        rows: List of dicts of column values
+        index_elements: Columns of the unique constraint to conflict on
+        update_fields: Columns to overwrite on conflict
+    """
+    insert = postgresql_insert if session.bind.dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(model).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={field: stmt.excluded[field] for field in update_fields},
+    )
+    await session.exec(stmt)
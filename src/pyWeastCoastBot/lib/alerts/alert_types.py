@@ -0,0 +1,13 @@
+from enum import Enum
+
+
+class AssetType(Enum):
+    stock = "stock"
+    crypto = "crypto"
+
+
+class AlertKind(Enum):
+    above = "above"
+    below = "below"
+    # Either direction, threshold is a percent of the price when the alert was set
+    move = "move"
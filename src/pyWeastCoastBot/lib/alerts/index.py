@@ -0,0 +1,70 @@
+import bisect
+from collections import defaultdict
+
+from pyWeastCoastBot.lib.alerts.alert_types import AlertKind
+
+
+def trigger_prices(alert):
+    """Prices an alert fires at, as (direction, price) with direction "up" or "down"."""
+    kind = AlertKind(alert.kind)
+    if kind == AlertKind.above:
+        return [("up", alert.threshold)]
+    if kind == AlertKind.below:
+        return [("down", alert.threshold)]
+    move = alert.reference_price * alert.threshold / 100
+    return [("up", alert.reference_price + move), ("down", alert.reference_price - move)]
+
+
+class AlertIndex:
+    """Sorted trigger prices per symbol, so a price update only touches the alerts it crossed.
+
+    Each (asset type, symbol) keeps two ascending lists of (price, alert id):
+    ones that fire when the price rises to them and ones that fire when it
+    falls to them. The crossed alerts are then a prefix or suffix of a list,
+    found by bisection.
+    """
+
+    def __init__(self):
+        # (asset_type, symbol) -> direction -> sorted [(price, alert_id)]
+        self._triggers = defaultdict(lambda: dict(up=[], down=[]))
+        # alert_id -> ((asset_type, symbol), [(direction, price)])
+        self._alerts = {}
+
+    def __len__(self):
+        return len(self._alerts)
+
+    def symbols(self, asset_type):
+        """Distinct symbols with active alerts for an asset type."""
+        return sorted(symbol for kind, symbol in self._triggers if kind == asset_type)
+
+    def add(self, alert):
+        key = (alert.asset_type, alert.symbol)
+        triggers = trigger_prices(alert)
+        for direction, price in triggers:
+            bisect.insort(self._triggers[key][direction], (price, alert.id))
+        self._alerts[alert.id] = (key, triggers)
+
+    def remove(self, alert_id):
+        key, triggers = self._alerts.pop(alert_id, (None, []))
+        for direction, price in triggers:
+            entries = self._triggers[key][direction]
+            i = bisect.bisect_left(entries, (price, alert_id))
+            if i < len(entries) and entries[i] == (price, alert_id):
+                del entries[i]
+        if key is not None and not any(self._triggers[key].values()):
+            del self._triggers[key]
+
+    def crossed(self, asset_type, symbol, price):
+        """Ids of alerts whose trigger price has been reached.
+
+        They stay indexed until ``remove``d, so an alert whose delivery fails fires again on the next check.
+        """
+        key = (asset_type, symbol)
+        if key not in self._triggers:
+            return []
+
+        up = self._triggers[key]["up"]
+        down = self._triggers[key]["down"]
+        crossed = [alert_id for _, alert_id in up[: bisect.bisect_right(up, (price, float("inf")))]]
+        crossed += [alert_id for _, alert_id in down[bisect.bisect_left(down, (price, float("-inf"))) :]]
+        return list(dict.fromkeys(crossed))
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlmodel import delete, select
+
+from pyWeastCoastBot.db.models import PriceAlert
+from pyWeastCoastBot.db.session import get_session
+from pyWeastCoastBot.lib.alerts.alert_types import AlertKind, AssetType
+from pyWeastCoastBot.lib.alerts.index import AlertIndex
+from pyWeastCoastBot.lib.crypto.cg import CoinGeckoClient, cg
+from pyWeastCoastBot.utils.errors import InvalidParameter, NotFound
+from pyWeastCoastBot.utils.lazy_import import lazy_import
+from pyWeastCoastBot.utils.metrics import track_upstream
+
+yf = lazy_import("yfinance")
+
+PRICE_CONDITION = re.compile(r"^(<|>|below|above)\s*\$?\s*([\d,]*\.?\d+)$")
+MOVE_CONDITION = re.compile(r"^(?:moves?\s*)?(\d+(?:\.\d+)?|\.\d+)\s*%$")
+
+
+def parse_condition(condition):
+    """Parse an alert condition like "< 150", "above 200" or "moves 5%".
+
+    Returns:
+        tuple: The AlertKind and its threshold
+    """
+    text = " ".join(condition.lower().split())
+    match = PRICE_CONDITION.match(text)
+    if match:
+        kind = AlertKind.below if match.group(1) in ("<", "below") else AlertKind.above
+        threshold = float(match.group(2).replace(",", ""))
+    elif match := MOVE_CONDITION.match(text):
+        kind, threshold = AlertKind.move, float(match.group(1))
+    else:
+        raise InvalidParameter(f"Couldn't understand '{condition}', try '< 150', '> 200' or 'moves 5%'")
+
+    if threshold <= 0:
+        raise InvalidParameter("Alert threshold must be positive")
+    return kind, threshold
+
+
+def fetch_stock_prices(symbols):
+    """Latest prices for many tickers in one yfinance download."""
+    with track_upstream("yfinance", "download"):
+        history = yf.download(
+            list(symbols),
+            period="5d",
+            interval="1d",
+            threads=True,
+            progress=False,
+            multi_level_index=True,
+        )
+    if history is None or history.empty:
+        return {}
+    # The last daily bar is the current session's, its close is the latest price
+    closes = history["Close"].ffill().iloc[-1]
+    return {symbol: float(price) for symbol, price in closes.items() if price == price}
+
+
+def fetch_crypto_prices(coin_ids):
+    """Latest USD prices for many coins in one CoinGecko request."""
+    prices = cg.get_price(ids=list(coin_ids), vs_currencies="usd")
+    return {coin_id: price["usd"] for coin_id, price in prices.items() if "usd" in price}
+
+
+class AlertService:
+    """Price alerts, checked in one batched poll per asset type.
+
+    The database holds the alerts, an in-memory AlertIndex of their trigger
+    prices decides which ones a price update fired. A poll makes one request
+    per asset type for every distinct symbol, however many alerts there are.
+    """
+
+    price_fetchers = {
+        AssetType.stock: fetch_stock_prices,
+        AssetType.crypto: fetch_crypto_prices,
+    }
+
+    def __init__(self):
+        self.index = AlertIndex()
+        self.coingecko = CoinGeckoClient()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="alert_fetch")
+
+    async def _run_in_executor(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def load(self):
+        """Index every stored alert."""
+        async for session in get_session():
+            result = await session.exec(select(PriceAlert))
+            for alert in result.all():
+                self.index.add(alert)
+        logging.info(f"Loaded {len(self.index)} price alerts")
+
+    async def get_prices(self, asset_type, symbols):
+        if not symbols:
+            return {}
+        return await self._run_in_executor(self.price_fetchers[asset_type], symbols)
+
+    async def resolve_symbol(self, asset_type, search):
+        if asset_type == AssetType.crypto:
+            return await self.coingecko.lookup_coin_id(search)
+        return search.strip().upper()
+
+    async def create_alert(self, user_id, guild_id, channel_id, asset_type, search, condition):
+        kind, threshold = parse_condition(condition)
+        symbol = await self.resolve_symbol(asset_type, search)
+        price = (await self.get_prices(asset_type, [symbol])).get(symbol)
+        if price is None:
+            raise NotFound(f"Couldn't get a price for {symbol}")
+        if kind == AlertKind.above and price >= threshold:
+            raise InvalidParameter(f"{symbol} is already above {threshold:,.2f} ({price:,.2f})")
+        if kind == AlertKind.below and price <= threshold:
+            raise InvalidParameter(f"{symbol} is already below {threshold:,.2f} ({price:,.2f})")
+
+        alert = PriceAlert(
+            user_id=str(user_id),
+            guild_id=str(guild_id),
+            channel_id=str(channel_id),
+            asset_type=asset_type.value,
+            symbol=symbol,
+            kind=kind.value,
+            threshold=threshold,
+            reference_price=price,
+        )
+        async for session in get_session():
+            session.add(alert)
+            await session.commit()
+            await session.refresh(alert)
+        self.index.add(alert)
+        return alert
+
+    async def get_user_alerts(self, user_id, guild_id):
+        async for session in get_session():
+            stmt = (
+                select(PriceAlert)
+                .where(PriceAlert.user_id == str(user_id))
+                .where(PriceAlert.guild_id == str(guild_id))
+                .order_by(PriceAlert.created_at)
+            )
+            result = await session.exec(stmt)
+            alerts = result.all()
+        return alerts
+
+    async def delete_alert(self, alert_id, user_id, guild_id):
+        """Delete one of a user's alerts, returning whether it existed."""
+        async for session in get_session():
+            stmt = (
+                select(PriceAlert)
+                .where(PriceAlert.id == alert_id)
+                .where(PriceAlert.user_id == str(user_id))
+                .where(PriceAlert.guild_id == str(guild_id))
+            )
+            alert = (await session.exec(stmt)).first()
+            if alert is not None:
+                await session.delete(alert)
+                await session.commit()
+        if alert is None:
+            return False
+        self.index.remove(alert_id)
+        return True
+
+    async def delete_alerts(self, alert_ids):
+        """Delete delivered alerts, dropping them from the index once the delete has committed."""
+        async for session in get_session():
+            await session.exec(delete(PriceAlert).where(PriceAlert.id.in_(alert_ids)))
+            await session.commit()
+        for alert_id in alert_ids:
+            self.index.remove(alert_id)
+
+    async def get_triggered_alerts(self):
+        """Poll prices for every alerted symbol and find the alerts they fired.
+
+        Returns:
+            list: (PriceAlert, price) pairs for the fired alerts, left indexed and stored until the caller
+            delivers them and calls ``delete_alerts``
+        """
+        asset_types = list(AssetType)
+        results = await asyncio.gather(
+            *(self.get_prices(asset_type, self.index.symbols(asset_type.value)) for asset_type in asset_types),
+            return_exceptions=True,
+        )
+
+        fired_prices = {}
+        for asset_type, prices in zip(asset_types, results):
+            if isinstance(prices, Exception):
+                logging.error(f"Error fetching {asset_type.value} prices for alerts: {prices}")
+                continue
+            for symbol, price in prices.items():
+                for alert_id in self.index.crossed(asset_type.value, symbol, price):
+                    fired_prices[alert_id] = price
+
+        if not fired_prices:
+            return []
+        async for session in get_session():
+            result = await session.exec(select(PriceAlert).where(PriceAlert.id.in_(list(fired_prices))))
+            alerts = result.all()
+        # Deleted by their owner while prices were being fetched
+        for alert_id in fired_prices.keys() - {alert.id for alert in alerts}:
+            self.index.remove(alert_id)
+        return [(alert, fired_prices[alert.id]) for alert in alerts]
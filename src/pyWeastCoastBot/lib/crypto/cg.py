@@ -1,43 +1,90 @@
-from functools import cached_property
+import numpy as np
 
-import pandas as pd
-from pycoingecko import CoinGeckoAPI
+from pyWeastCoastBot import config
+from pyWeastCoastBot.lib.crypto.coin import Coin, CoinPriceHistory
+from pyWeastCoastBot.lib.crypto.crypto_ranges import CryptoRanges
+from pyWeastCoastBot.lib.crypto.registry import CoinRegistry
+from pyWeastCoastBot.utils.cache import SingleFlight, TTLCache
+from pyWeastCoastBot.utils.lazy_import import lazy_import
+from pyWeastCoastBot.utils.metrics import InstrumentedClient
+from pyWeastCoastBot.utils.rate_limit import RateLimited, TokenBucket
 
-from pyWeastCoastBot.lib.crypto.coin import Coin
-from pyWeastCoastBot.utils.errors import NotFound
-from pyWeastCoastBot.utils.graph import generate_line_plot_image
+pycoingecko = lazy_import("pycoingecko")
 
-cg = CoinGeckoAPI()
+# Every CoinGecko call in the bot shares this limit, so bursts queue rather than get 429s
+cg = RateLimited(
+    lambda: InstrumentedClient(pycoingecko.CoinGeckoAPI(), "coingecko"),
+    TokenBucket(
+        rate=config.COINGECKO_CALLS_PER_MINUTE / 60,
+        capacity=max(1, config.COINGECKO_CALLS_PER_MINUTE // 2),
+    ),
+)
 # https://www.coingecko.com/en/api/documentation
 
+RANGE_DAYS = {
+    CryptoRanges.one_day: 1,
+    CryptoRanges.seven_day: 7,
+    CryptoRanges.thirty_day: 30,
+    CryptoRanges.one_year: 365,
+}
+# CoinGecko picks the granularity from the days asked for: 5 minutely for 1, hourly up to 90, daily past that.
+# Ranges share the longest fetch that still has useful detail for them and are sliced from it.
+FETCH_DAYS = {
+    CryptoRanges.one_day: 1,
+    CryptoRanges.seven_day: 90,
+    CryptoRanges.thirty_day: 90,
+    CryptoRanges.one_year: 365,
+}
+
 
 class CoinGeckoClient:
-    @cached_property
-    def all_coins(self):
-        # format: [{
-        #     "id": "bitcoin",
-        #     "symbol": "btc",
-        #     "name": "Bitcoin"
-        #   }]
-        return cg.get_coins_list()
-
-    @property
-    def coin_id_by_symbol(self):
-        return {coin["symbol"]: coin["id"] for coin in self.all_coins}
-
-    @property
-    def all_coin_ids(self):
-        return {coin["id"] for coin in self.all_coins}
-
-    def lookup_coin_id(self, search):
-        search = search.lower()
-        if search in self.all_coin_ids:
-            return search
-        if search in self.coin_id_by_symbol:
-            return self.coin_id_by_symbol[search]
-        raise NotFound("Could not find coin by name or symbol")
-
-    def get_coin_market_data(self, coin_id):
+    """CoinGecko lookups. Fetches block, so call them from an executor.
+
+    Responses are cached briefly and identical concurrent requests share
+    one upstream call.
+    """
+
+    # Shared by every client, the coin list is the same for all of them
+    registry = CoinRegistry(cg)
+
+    market_data_ttl_seconds = 60
+    # By days fetched, coarser series change less often
+    chart_ttl_seconds = {1: 5 * 60, 90: 15 * 60, 365: 60 * 60}
+    _market_data_cache = TTLCache(max_entries=256, ttl_seconds=market_data_ttl_seconds)
+    _chart_cache = TTLCache(max_entries=256)
+    _in_flight = SingleFlight()
+
+    @classmethod
+    def _get_cached(cls, cache, key, fetch, *args, ttl_seconds=None, **kwargs):
+        value = cache.get(key)
+        if value is None:
+            value = cls._in_flight.do(key, fetch, *args, **kwargs)
+            cache.set(key, value, ttl_seconds=ttl_seconds)
+        return value
+
+    @staticmethod
+    def _fetch_market_chart(coin_id, currency, days):
+        chart_data = cg.get_coin_market_chart_by_id(coin_id, vs_currency=currency, days=days)
+        prices = np.asarray(chart_data["prices"], dtype=float).reshape(-1, 2)
+        return prices[:, 0].astype(np.int64), prices[:, 1]
+
+    @classmethod
+    def cache_stats(cls):
+        return {
+            name: dict(
+                hits=cache.stats.hits,
+                misses=cache.stats.misses,
+                hit_rate=round(cache.stats.hit_rate, 3),
+                entries=len(cache),
+            )
+            for name, cache in (("market_data", cls._market_data_cache), ("chart", cls._chart_cache))
+        }
+
+    async def lookup_coin_id(self, search):
+        await self.registry.ensure_loaded()
+        return self.registry.lookup_coin_id(search)
+
+    def get_coin_market_data(self, coin_id, currency="usd"):
         params = dict(
             localization=False,
             tickers=False,
@@ -47,12 +94,19 @@ class CoinGeckoClient:
             sparkline=False,
         )
 
-        coin_data = cg.get_coin_by_id(coin_id, **params)
-        return Coin.from_cg_coin_data(coin_data)
+        # Has market data in every currency, so it's cached once per coin
+        coin_data = self._get_cached(self._market_data_cache, ("coin", coin_id), cg.get_coin_by_id, coin_id, **params)
+        return Coin.from_cg_coin_data(coin_data, currency)
 
-    def get_coin_price_graph_image(self, coin_id):
-        params = dict(vs_currency="usd", days=1)
-        chart_data = cg.get_coin_market_chart_by_id(coin_id, **params)
-        df = pd.DataFrame(chart_data["prices"], columns=["time", "price"])
-        df["time"] = pd.to_datetime(df["time"], unit="ms", utc=True)
-        return generate_line_plot_image(df, x="time", y="price", labels=dict(time="Time", price="Price (USD)"))
+    def get_coin_price_history(self, coin_id, currency="usd", price_range=CryptoRanges.one_day):
+        fetch_days = FETCH_DAYS[price_range]
+        times, prices = self._get_cached(
+            self._chart_cache,
+            ("market_chart", coin_id, currency, fetch_days),
+            self._fetch_market_chart,
+            coin_id,
+            currency,
+            fetch_days,
+            ttl_seconds=self.chart_ttl_seconds[fetch_days],
+        )
+        return CoinPriceHistory.from_cg_prices(times, prices, currency, RANGE_DAYS[price_range])
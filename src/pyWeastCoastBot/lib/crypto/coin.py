@@ -1,8 +1,15 @@
 import attr
+import numpy as np
+
+from pyWeastCoastBot.utils.chart_renderer import LinePlotPayload
+from pyWeastCoastBot.utils.errors import InvalidParameter, NotFound
+from pyWeastCoastBot.utils.graph import WIDTH_PX
+from pyWeastCoastBot.utils.math import min_max_downsample
 
 
 @attr.s
 class CoinMarketData:
+    currency = attr.ib()
     current_price = attr.ib()
     price_high_24h = attr.ib()
     price_low_24h = attr.ib()
@@ -13,7 +20,10 @@ class CoinMarketData:
 
     @staticmethod
     def from_cg_market_data(market_data, currency="usd"):
+        if currency not in market_data["current_price"]:
+            raise InvalidParameter(f"No {currency.upper()} prices for this coin")
         return CoinMarketData(
+            currency=currency,
             current_price=market_data["current_price"][currency],
             price_high_24h=market_data["high_24h"][currency],
             price_low_24h=market_data["low_24h"][currency],
@@ -33,12 +43,13 @@ class Coin:
     market_data = attr.ib()
 
     @staticmethod
-    def from_cg_coin_data(coin_data):
+    def from_cg_coin_data(coin_data, currency="usd"):
+        """Build a coin from get_coin_by_id data, which has market data in every currency."""
         home_page_urls = coin_data["links"]["homepage"]
 
         market_data = None
         if "market_data" in coin_data:
-            market_data = CoinMarketData.from_cg_market_data(coin_data["market_data"])
+            market_data = CoinMarketData.from_cg_market_data(coin_data["market_data"], currency)
 
         return Coin(
             symbol=coin_data["symbol"],
@@ -47,3 +58,49 @@ class Coin:
             symbol_image_url=coin_data["image"]["large"],
             market_data=market_data,
         )
+
+
+@attr.s
+class CoinPriceHistory:
+    currency = attr.ib()
+    first_price = attr.ib()
+    last_price = attr.ib()
+    change_percentage = attr.ib()
+    # UTC times and prices for the chart
+    _times = attr.ib()
+    _prices = attr.ib()
+
+    max_chart_points = 2 * WIDTH_PX
+
+    @property
+    def price_graph_payload(self):
+        label = f"Price ({self.currency.upper()})"
+        return LinePlotPayload(x=self._times, series=((label, self._prices),), xlabel="Time", ylabel=label)
+
+    @staticmethod
+    def from_cg_prices(times, prices, currency, days):
+        """Slice the last ``days`` from a market_chart price series.
+
+        Args:
+            times: Unix times in milliseconds, ascending
+            prices: Price at each time
+            currency: Currency the prices are in
+            days: Days of history to keep, counted back from the last price
+        """
+        if not len(times):
+            raise NotFound("No price history for this coin")
+
+        start = np.searchsorted(times, times[-1] - days * 24 * 60 * 60 * 1000)
+        times, prices = times[start:], prices[start:]
+        first_price, last_price = prices[0], prices[-1]
+        chart_times, chart_prices = min_max_downsample(
+            times.astype("datetime64[ms]").astype("datetime64[ns]"), prices, CoinPriceHistory.max_chart_points
+        )
+        return CoinPriceHistory(
+            currency=currency,
+            first_price=first_price,
+            last_price=last_price,
+            change_percentage=(last_price / first_price - 1) * 100 if first_price else 0.0,
+            times=chart_times,
+            prices=chart_prices,
+        )
@@ -0,0 +1,11 @@
+from enum import Enum
+
+
+class CryptoCurrencies(Enum):
+    usd = "usd"
+    eur = "eur"
+    gbp = "gbp"
+    jpy = "jpy"
+    cad = "cad"
+    aud = "aud"
+    inr = "inr"
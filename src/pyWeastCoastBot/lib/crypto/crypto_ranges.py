@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class CryptoRanges(Enum):
+    one_day = "1d"
+    seven_day = "7d"
+    thirty_day = "30d"
+    one_year = "1y"
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+import attr
+from sqlmodel import delete, select
+
+from pyWeastCoastBot.db.models import CoinGeckoCoin
+from pyWeastCoastBot.db.session import get_session
+from pyWeastCoastBot.db.utils import upsert
+from pyWeastCoastBot.utils.errors import NotFound
+from pyWeastCoastBot.utils.prefix_index import PrefixIndex, normalize
+from pyWeastCoastBot.utils.time import ensure_utc, utc_now
+
+UNRANKED = float("inf")
+
+
+def trigrams(text):
+    padded = f"  {normalize(text)} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+@attr.s(frozen=True, slots=True)
+class CoinListing:
+    id = attr.ib()
+    symbol = attr.ib()
+    name = attr.ib()
+    market_cap_rank = attr.ib(default=None)
+
+    @property
+    def sort_key(self):
+        return (self.market_cap_rank or UNRANKED, self.id)
+
+
+class CoinIndex:
+    """Immutable lookup structures over a coin list, built once per refresh.
+
+    Symbols collide a lot (dozens of coins claim "eth"), so every key maps
+    to its coins best market cap rank first.
+    """
+
+    def __init__(self, listings):
+        self.listings = sorted(listings, key=lambda listing: listing.sort_key)
+        self.by_id = {listing.id: listing for listing in self.listings}
+        by_symbol = defaultdict(list)
+        by_name = defaultdict(list)
+        postings = defaultdict(list)
+        self._trigram_counts = []
+        for position, listing in enumerate(self.listings):
+            # listings are already ranked, so appending keeps every index ranked too
+            by_symbol[normalize(listing.symbol)].append(listing.id)
+            by_name[normalize(listing.name)].append(listing.id)
+            grams = trigrams(listing.name)
+            for gram in grams:
+                postings[gram].append(position)
+            self._trigram_counts.append(len(grams))
+
+        self.by_symbol = {symbol: tuple(ids) for symbol, ids in by_symbol.items()}
+        self.by_name = {name: tuple(ids) for name, ids in by_name.items()}
+        self._trigrams = {gram: tuple(positions) for gram, positions in postings.items()}
+        self._prefixes = PrefixIndex(((listing.symbol, listing.name), listing) for listing in self.listings)
+
+    def __len__(self):
+        return len(self.listings)
+
+    def lookup(self, search):
+        """Exact coin id, symbol or name match, best ranked first."""
+        key = normalize(search)
+        if key in self.by_id:
+            return self.by_id[key]
+        for index in (self.by_symbol, self.by_name):
+            if key in index:
+                return self.by_id[index[key][0]]
+        return None
+
+    def prefix_matches(self, prefix, limit=25):
+        """Coins whose symbol or name starts with ``prefix``, best ranked first."""
+        return self._prefixes.matches(prefix, limit=limit)
+
+    def fuzzy_matches(self, search, limit=5, min_similarity=0.3):
+        """Coins whose names share the most trigrams with ``search``, best ranked breaking ties."""
+        grams = trigrams(search)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._trigrams.get(gram, ()))
+
+        scored = []
+        for position, count in shared.items():
+            similarity = count / (len(grams) + self._trigram_counts[position] - count)
+            if similarity >= min_similarity:
+                scored.append((-similarity, position))
+        scored.sort()
+        return [self.listings[position] for _, position in scored[:limit]]
+
+
+class CoinRegistry:
+    """CoinGecko's coin list, persisted to the database and indexed in memory.
+
+    Startup loads the stored list, so the bot only needs CoinGecko for the
+    list on its very first run. ``refresh`` pulls a new list plus market
+    cap ranks and swaps in a new index; it's meant to run in the background.
+    """
+
+    refresh_every = timedelta(days=1)
+    # Pages of 250 from /coins/markets fetched for market cap ranks, the rest stay unranked
+    ranked_pages = 4
+    upsert_batch_size = 1000
+
+    def __init__(self, cg):
+        self.cg = cg
+        self.index = CoinIndex([])
+        self.refreshed_at = None
+        self._load_lock = asyncio.Lock()
+        self._loaded = False
+
+    @property
+    def is_loaded(self):
+        return self._loaded
+
+    @property
+    def is_stale(self):
+        return self.refreshed_at is None or utc_now() - self.refreshed_at >= self.refresh_every
+
+    async def ensure_loaded(self):
+        """Load the stored coin list the first time it's needed, fetching it if nothing is stored."""
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            await self.load()
+            if not len(self.index):
+                await self.refresh()
+            self._loaded = True
+
+    @staticmethod
+    async def _build_index(listings):
+        # Indexing ~15k coins takes a few hundred ms, too long to hold the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, CoinIndex, listings)
+
+    async def load(self):
+        async for session in get_session():
+            result = await session.exec(select(CoinGeckoCoin))
+            coins = result.all()
+        self.index = await self._build_index(
+            [
+                CoinListing(id=coin.coin_id, symbol=coin.symbol, name=coin.name, market_cap_rank=coin.market_cap_rank)
+                for coin in coins
+            ]
+        )
+        if coins:
+            self.refreshed_at = min(ensure_utc(coin.updated_at) for coin in coins)
+        logging.info(f"Loaded {len(self.index)} CoinGecko coins")
+
+    def _fetch_listings(self):
+        ranks = {}
+        for page in range(1, self.ranked_pages + 1):
+            markets = self.cg.get_coins_markets(vs_currency="usd", order="market_cap_desc", per_page=250, page=page)
+            ranks.update({coin["id"]: coin.get("market_cap_rank") for coin in markets})
+        return [
+            CoinListing(id=coin["id"], symbol=coin["symbol"], name=coin["name"], market_cap_rank=ranks.get(coin["id"]))
+            for coin in self.cg.get_coins_list()
+        ]
+
+    async def refresh(self):
+        """Fetch the current coin list and ranks, store them and rebuild the index."""
+        listings = await asyncio.get_running_loop().run_in_executor(None, self._fetch_listings)
+        if not listings:
+            logging.warning("CoinGecko returned an empty coin list, keeping the current one")
+            return
+
+        refreshed_at = utc_now()
+        rows = [
+            dict(
+                coin_id=listing.id,
+                symbol=listing.symbol,
+                name=listing.name,
+                market_cap_rank=listing.market_cap_rank,
+                updated_at=refreshed_at,
+            )
+            for listing in listings
+        ]
+        async for session in get_session():
+            for i in range(0, len(rows), self.upsert_batch_size):
+                await upsert(
+                    session,
+                    CoinGeckoCoin,
+                    rows[i : i + self.upsert_batch_size],
+                    index_elements=["coin_id"],
+                    update_fields=["symbol", "name", "market_cap_rank", "updated_at"],
+                )
+            # Coins CoinGecko no longer lists
+            await session.exec(delete(CoinGeckoCoin).where(CoinGeckoCoin.updated_at < refreshed_at))
+            await session.commit()
+
+        self.index = await self._build_index(listings)
+        self.refreshed_at = refreshed_at
+        logging.info(f"Refreshed {len(listings)} CoinGecko coins")
+
+    def lookup_coin_id(self, search):
+        listing = self.index.lookup(search)
+        if listing is None:
+            matches = self.index.fuzzy_matches(search, limit=1, min_similarity=0.5)
+            listing = matches[0] if matches else None
+        if listing is None:
+            raise NotFound("Could not find coin by name or symbol")
+        return listing.id
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+
+from sqlmodel import select
+
+from pyWeastCoastBot.db.models import ThirdPartyAuth
+from pyWeastCoastBot.db.session import get_session
+
+
+class AuthRepository:
+    """Every ThirdPartyAuth row held in memory, so commands and scheduled runs don't query for them.
+
+    The table only changes on register, disconnect and token refresh. Each of
+    those commits to the database and then calls ``put`` or ``remove``, which
+    keeps the indexes here in step. Rows are loaded on first use.
+    """
+
+    def __init__(self):
+        # (user_id, guild_id, provider) -> auth
+        self._by_key = {}
+        # (provider, guild_id) -> {user_id: auth}
+        self._by_guild = {}
+        self._load_lock = asyncio.Lock()
+        self._loaded = False
+
+    async def ensure_loaded(self):
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            await self.load()
+            self._loaded = True
+
+    async def load(self):
+        async for session in get_session():
+            result = await session.exec(select(ThirdPartyAuth))
+            auths = result.all()
+        self._by_key = {}
+        self._by_guild = {}
+        for auth in auths:
+            self._index(auth)
+        logging.info(f"Loaded {len(auths)} third party auths")
+
+    async def get(self, user_id, guild_id, provider):
+        await self.ensure_loaded()
+        return self._by_key.get((str(user_id), str(guild_id), provider))
+
+    async def get_guild_auths(self, guild_id, provider):
+        await self.ensure_loaded()
+        return list(self._by_guild.get((provider, str(guild_id)), {}).values())
+
+    async def get_guild_ids(self, provider):
+        """Guilds with at least one registered user for a provider."""
+        await self.ensure_loaded()
+        return sorted(guild_id for auth_provider, guild_id in self._by_guild if auth_provider == provider)
+
+    async def get_provider_auths(self, provider):
+        await self.ensure_loaded()
+        return [auth for auth in self._by_key.values() if auth.provider == provider]
+
+    async def put(self, auth):
+        """Index a committed auth, replacing any held for the same user, guild and provider."""
+        # Waiting for the load keeps a load that started before this commit from overwriting it
+        await self.ensure_loaded()
+        self._index(auth)
+
+    async def remove(self, auth):
+        await self.ensure_loaded()
+        self._by_key.pop((auth.user_id, auth.guild_id, auth.provider), None)
+        guild_key = (auth.provider, auth.guild_id)
+        guild_auths = self._by_guild.get(guild_key, {})
+        guild_auths.pop(auth.user_id, None)
+        if not guild_auths:
+            self._by_guild.pop(guild_key, None)
+
+    def _index(self, auth):
+        self._by_key[(auth.user_id, auth.guild_id, auth.provider)] = auth
+        self._by_guild.setdefault((auth.provider, auth.guild_id), {})[auth.user_id] = auth
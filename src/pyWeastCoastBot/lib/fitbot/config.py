@@ -1,3 +1,5 @@
+from datetime import timedelta
+
 from pyWeastCoastBot.config import FITBIT_CLIENT_ID, FITBIT_CLIENT_SECRET
 
 
@@ -16,3 +18,19 @@ class FitbotConfig:
         "sleep",
         "social",
     ]
+    # Time series fetches run on a shared worker pool; cap how many users in a
+    # guild are fetched at once so one leaderboard can't starve the pool
+    max_fetch_workers = 8
+    max_concurrent_users = 4
+    request_timeout = 15
+    weekly_days = 7
+    # Cached daily stats are refetched until this long after the day ends (UTC),
+    # covering users in timezones behind UTC and late device syncs
+    stats_final_after = timedelta(hours=12)
+    # Users' profile timezones, the weekly window ends on their local today
+    timezone_ttl = timedelta(days=1)
+    # Fitbit access tokens last 8 hours. A background loop renews them this far
+    # ahead of expiry, more than its interval, so fetches never refresh inline
+    token_refresh_margin = timedelta(hours=1)
+    token_refresh_interval = timedelta(minutes=15)
+    token_refresh_concurrency = 4
@@ -1,84 +1,113 @@
 import asyncio
 import logging
 from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime
-from functools import cached_property
+from datetime import datetime, timedelta, timezone
+from functools import cache, cached_property
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 import attr
-import pandas as pd
-from fitbit import Fitbit
-from oauthlib.oauth2.rfc6749.errors import InvalidGrantError
-from sqlmodel import select
+from sqlmodel import delete, select
 
 from pyWeastCoastBot.db.models import ThirdPartyAuth
 from pyWeastCoastBot.db.session import async_session, get_session
+from pyWeastCoastBot.lib.fitbot.auth_repository import AuthRepository
 from pyWeastCoastBot.lib.fitbot.config import FitbotConfig
+from pyWeastCoastBot.lib.fitbot.stats_cache import FitbitStatsCache
+from pyWeastCoastBot.utils.cache import TTLCache
+from pyWeastCoastBot.utils.lazy_import import lazy_import
+from pyWeastCoastBot.utils.metrics import track_upstream
+from pyWeastCoastBot.utils.time import ensure_utc, utc_now
+
+fitbit = lazy_import("fitbit")
+oauth2_errors = lazy_import("oauthlib.oauth2.rfc6749.errors")
+pd = lazy_import("pandas")
+requests = lazy_import("requests")
+
+
+def apply_token(auth, token):
+    """Copy a token from Fitbit's OAuth endpoint onto a ThirdPartyAuth."""
+    auth.access_token = token["access_token"]
+    auth.refresh_token = token["refresh_token"]
+    auth.expires_at = datetime.fromtimestamp(token["expires_at"], timezone.utc)
+    auth.provider_user_id = token.get("user_id") or auth.provider_user_id
+
+
+def profile_timezone(profile):
+    """Timezone of a Fitbit user profile, UTC if it has none we know."""
+    user = profile.get("user", {})
+    try:
+        return ZoneInfo(user["timezone"])
+    except (KeyError, TypeError, ValueError, ZoneInfoNotFoundError):
+        pass
+    offset_millis = user.get("offsetFromUTCMillis")
+    if offset_millis is not None:
+        return timezone(timedelta(milliseconds=offset_millis))
+    return timezone.utc
+
+
+@cache
+def unauth_fitbit():
+    """Fitbit client for the OAuth flow, before a user has tokens."""
+    return fitbit.Fitbit(FitbotConfig.client_id, FitbotConfig.client_secret, timeout=10)
 
 
 class FitbotService:
     config = FitbotConfig()
-    unauth_fitbit = Fitbit(
-        config.client_id,
-        config.client_secret,
-        timeout=10,
+    # Fitbit client is sync, so API calls are run on this pool to keep them off the event loop
+    _executor = ThreadPoolExecutor(max_workers=config.max_fetch_workers, thread_name_prefix="fitbit_fetch")
+    _refresh_executor = ThreadPoolExecutor(
+        max_workers=config.token_refresh_concurrency, thread_name_prefix="fitbit_token_refresh"
     )
+    # Auths whose refresh token Fitbit rejected, skipped until the user registers again
+    _rejected_auth_ids = set()
+    auths = AuthRepository()
+    # Fitbit user id -> profile timezone
+    _timezones = TTLCache(max_entries=1000, ttl_seconds=config.timezone_ttl.total_seconds())
 
     @classmethod
     def auth_url(cls):
-        url, _ = cls.unauth_fitbit.client.authorize_token_url(
+        url, _ = unauth_fitbit().client.authorize_token_url(
             scope=cls.config.scope, redirect_uri="https://ejnarvala.github.io/pyWeastCoastBot/oauth-callback.html"
         )
         return url
 
     @classmethod
     async def is_user_registered(cls, user_id, guild_id):
-        async for session in get_session():
-            stmt = select(ThirdPartyAuth).where(
-                ThirdPartyAuth.user_id == str(user_id),
-                ThirdPartyAuth.provider == FitbotConfig.provider,
-                ThirdPartyAuth.guild_id == str(guild_id),
-            )
-            result = await session.exec(stmt)
-            return result.first() is not None
+        return await cls.auths.get(user_id, guild_id, FitbotConfig.provider) is not None
 
     @classmethod
     async def store_auth_token(cls, user_id, guild_id, code):
-        token = cls.unauth_fitbit.client.fetch_access_token(code)
+        with track_upstream("fitbit", "fetch_access_token"):
+            token = unauth_fitbit().client.fetch_access_token(code)
         auth = ThirdPartyAuth(
             user_id=str(user_id),
             provider=cls.config.provider,
             guild_id=str(guild_id),
+            provider_user_id=token.get("user_id"),
             access_token=token["access_token"],
             refresh_token=token["refresh_token"],
             scope=",".join(token["scope"]),
-            expires_at=datetime.fromtimestamp(token["expires_at"]),
+            expires_at=datetime.fromtimestamp(token["expires_at"], timezone.utc),
         )
 
         async for session in get_session():
             session.add(auth)
             await session.commit()
             await session.refresh(auth)
-            return auth
+        await cls.auths.put(auth)
+        return auth
 
     @classmethod
     async def disconnect_user(cls, user_id, guild_id):
         auth = await cls.get_user_auth(user_id, guild_id)
         async for session in get_session():
-            # Need to merge or re-fetch to attach to current session if passed auth is detached
-            await session.delete(auth)
+            await session.exec(delete(ThirdPartyAuth).where(ThirdPartyAuth.id == auth.id))
             await session.commit()
+        await cls.auths.remove(auth)
 
-    @staticmethod
-    async def get_user_auth(user_id, guild_id):
-        async for session in get_session():
-            stmt = select(ThirdPartyAuth).where(
-                ThirdPartyAuth.user_id == str(user_id),
-                ThirdPartyAuth.provider == FitbotConfig.provider,
-                ThirdPartyAuth.guild_id == str(guild_id),
-            )
-            result = await session.exec(stmt)
-            auth = result.first()
-
+    @classmethod
+    async def get_user_auth(cls, user_id, guild_id):
+        auth = await cls.auths.get(user_id, guild_id, FitbotConfig.provider)
         if not auth:
             raise LookupError("User fitbit credentials not found")
         return auth
@@ -93,76 +122,237 @@ class FitbotService:
             auth: ThirdPartyAuth object (optional, will be fetched if not provided)
 
         Returns:
-            Fitbit: Authenticated Fitbit client with automatic token refresh
+            Fitbit: Authenticated Fitbit client. Tokens are kept fresh by
+            ``refresh_expiring_tokens``, refreshing on expiry is only a fallback.
         """
         auth = auth or await FitbotService.get_user_auth(user_id, guild_id)
 
         # Create token refresher with just the IDs (not the detached auth object)
         # This avoids session detachment issues
-        return Fitbit(
+        return fitbit.Fitbit(
             FitbotConfig.client_id,
             FitbotConfig.client_secret,
             access_token=auth.access_token,
             refresh_token=auth.refresh_token,
-            expires_at=int(auth.expires_at.timestamp()) if auth.expires_at else None,
+            expires_at=int(ensure_utc(auth.expires_at).timestamp()) if auth.expires_at else None,
             refresh_cb=FitbitTokenRefresher(
                 user_id=auth.user_id,
                 guild_id=auth.guild_id,
                 provider=auth.provider,
+                loop=asyncio.get_running_loop(),
             ),
+            timeout=FitbotConfig.request_timeout,
         )
 
     @classmethod
-    async def get_guild_weekly_stats(cls, guild_id):
-        user_auths = []
+    async def refresh_expiring_tokens(cls):
+        """Refresh every token that expires within the refresh margin and store them in one transaction.
+
+        Returns:
+            int: How many tokens were refreshed
+        """
+        expiring_before = utc_now() + cls.config.token_refresh_margin
+        auths = [
+            auth
+            for auth in await cls.auths.get_provider_auths(FitbotConfig.provider)
+            if ensure_utc(auth.expires_at) <= expiring_before and auth.id not in cls._rejected_auth_ids
+        ]
+        if not auths:
+            return 0
+
+        semaphore = asyncio.Semaphore(cls.config.token_refresh_concurrency)
+        tokens = await asyncio.gather(*(cls._refresh_token_limited(auth, semaphore) for auth in auths))
+        refreshed = {auth.id: token for auth, token in zip(auths, tokens) if token is not None}
+        if not refreshed:
+            return 0
+
         async for session in get_session():
-            stmt = select(ThirdPartyAuth).where(
-                ThirdPartyAuth.provider == FitbotConfig.provider,
-                ThirdPartyAuth.guild_id == str(guild_id),
-            )
-            result = await session.exec(stmt)
-            user_auths = result.all()
+            result = await session.exec(select(ThirdPartyAuth).where(ThirdPartyAuth.id.in_(list(refreshed))))
+            stored_auths = result.all()
+            for auth in stored_auths:
+                apply_token(auth, refreshed[auth.id])
+                session.add(auth)
+            await session.commit()
+        for auth in stored_auths:
+            await cls.auths.put(auth)
+        logging.info(f"Refreshed {len(refreshed)} of {len(auths)} expiring fitbit tokens")
+        return len(refreshed)
+
+    @classmethod
+    async def _refresh_token_limited(cls, auth, semaphore):
+        """Refresh one auth's token, returning None if the refresh fails."""
+        async with semaphore:
+            try:
+                # Not wrapped in wait_for: the request times out itself, abandoning the thread instead could lose a
+                # token Fitbit already rotated when it answers late
+                with track_upstream("fitbit", "refresh_token"):
+                    return await asyncio.get_running_loop().run_in_executor(
+                        cls._refresh_executor, cls._refresh_token, auth
+                    )
+            except oauth2_errors.InvalidGrantError as e:
+                cls._rejected_auth_ids.add(auth.id)
+                logging.error(
+                    f"Fitbit rejected the refresh token for user {auth.user_id} in guild {auth.guild_id}. "
+                    f"User needs to re-register. Error: {e}"
+                )
+            except requests.exceptions.Timeout:
+                logging.error(f"Timed out refreshing token for user {auth.user_id} in guild {auth.guild_id}")
+            except Exception as e:
+                logging.error(f"Error refreshing token for user {auth.user_id}: {e}", exc_info=True)
+        return None
+
+    @staticmethod
+    def _refresh_token(auth):
+        client = fitbit.Fitbit(
+            FitbotConfig.client_id,
+            FitbotConfig.client_secret,
+            access_token=auth.access_token,
+            refresh_token=auth.refresh_token,
+            expires_at=int(ensure_utc(auth.expires_at).timestamp()),
+            timeout=FitbotConfig.request_timeout,
+        ).client
+        # FitbitOauth2Client.refresh_token doesn't pass its timeout on, so refresh through the session directly.
+        # The new token is returned and stored by the caller with the rest of its batch
+        return client.session.refresh_token(
+            client.refresh_token_url,
+            auth=requests.auth.HTTPBasicAuth(client.client_id, client.client_secret),
+            timeout=client.timeout,
+        )
+
+    @classmethod
+    async def get_guild_weekly_stats(cls, guild_id):
+        user_auths = await cls.auths.get_guild_auths(guild_id, FitbotConfig.provider)
+        semaphore = asyncio.Semaphore(cls.config.max_concurrent_users)
+        results = await asyncio.gather(
+            *(cls._get_user_weekly_stats_limited(auth, semaphore) for auth in user_auths),
+        )
+        return GuildWeeklyStats([stats for stats in results if stats is not None])
+
+    @classmethod
+    async def _get_user_weekly_stats_limited(cls, auth, semaphore):
+        """Fetch a user's weekly stats, returning None if the fetch fails.
 
-        user_stats = []
-        for auth in user_auths:
+        Args:
+            auth: ThirdPartyAuth for the user
+            semaphore: Caps how many users of a guild are fetched at once
+
+        Returns:
+            UserWeeklyStats, or None if the user's stats could not be fetched
+        """
+        async with semaphore:
             try:
-                stats = await cls.get_user_weekly_stats(auth)
-                user_stats.append(stats)
-            except InvalidGrantError as e:
+                return await cls.get_user_weekly_stats(auth)
+            except oauth2_errors.InvalidGrantError as e:
                 logging.error(
-                    f"Invalid grant error for user {auth.user_id} in guild {guild_id}. "
+                    f"Invalid grant error for user {auth.user_id} in guild {auth.guild_id}. "
                     f"Refresh token may be expired. User needs to re-register. Error: {e}"
                 )
                 # Optionally, could delete the invalid auth here
                 # await cls.disconnect_user(auth.user_id, auth.guild_id)
+            except TimeoutError:
+                logging.error(f"Timed out fetching stats for user {auth.user_id} in guild {auth.guild_id}")
             except Exception as e:
                 logging.error(f"Error fetching stats for user {auth.user_id}: {e}", exc_info=True)
-
-        return GuildWeeklyStats(user_stats)
+        return None
 
     @staticmethod
-    def _get_time_series(client, resource, period="7d"):
-        return client.time_series(f"activities/{resource}", period=period).get(f"activities-{resource}")
+    def _get_time_series(client, resource, base_date, end_date):
+        return client.time_series(f"activities/{resource}", base_date=base_date, end_date=end_date).get(
+            f"activities-{resource}"
+        )
+
+    @classmethod
+    async def _run_in_executor(cls, func, *args):
+        loop = asyncio.get_running_loop()
+        with track_upstream("fitbit", func.__name__.lstrip("_")):
+            return await asyncio.wait_for(
+                loop.run_in_executor(cls._executor, func, *args),
+                timeout=cls.config.request_timeout,
+            )
+
+    @classmethod
+    async def _get_provider_user_id(cls, client, auth):
+        """Resolve the Fitbit account id for an auth, backfilling it for older registrations."""
+        if auth.provider_user_id:
+            return auth.provider_user_id
+
+        profile = await cls._run_in_executor(client.user_profile_get)
+        provider_user_id = profile["user"]["encodedId"]
+        cls._timezones.set(provider_user_id, profile_timezone(profile))
+        async for session in get_session():
+            stmt = select(ThirdPartyAuth).where(ThirdPartyAuth.id == auth.id)
+            result = await session.exec(stmt)
+            stored_auth = result.first()
+            if stored_auth:
+                stored_auth.provider_user_id = provider_user_id
+                session.add(stored_auth)
+                await session.commit()
+        if stored_auth:
+            await cls.auths.put(stored_auth)
+        auth.provider_user_id = provider_user_id
+        return provider_user_id
+
+    @classmethod
+    async def _get_user_timezone(cls, client, fitbit_user_id):
+        tz = cls._timezones.get(fitbit_user_id)
+        if tz is None:
+            profile = await cls._run_in_executor(client.user_profile_get)
+            tz = profile_timezone(profile)
+            cls._timezones.set(fitbit_user_id, tz)
+        return tz
+
+    @classmethod
+    async def _get_cached_time_series(cls, client, fitbit_user_id, resource, days, closed_days):
+        """Get a resource's daily values, only fetching days that aren't closed in the cache.
+
+        Args:
+            client: Authenticated Fitbit client
+            fitbit_user_id: Fitbit account id the cache is keyed on
+            resource: Time series resource name (e.g. 'steps')
+            days: Days in the window, oldest first
+            closed_days: Cached {day: value} that don't need refreshing
+
+        Returns:
+            list: Fitbit style time series entries ({"dateTime", "value"}) for each day
+        """
+        values = dict(closed_days)
+        missing_days = [day for day in days if day not in closed_days]
+        if missing_days:
+            series = await cls._run_in_executor(cls._get_time_series, client, resource, missing_days[0], days[-1])
+            fetched = {datetime.strptime(d["dateTime"], "%Y-%m-%d").date(): d["value"] for d in series}
+            await FitbitStatsCache.store_days(fitbit_user_id, resource, fetched)
+            values.update(fetched)
+        return [{"dateTime": day.isoformat(), "value": values[day]} for day in days if day in values]
 
     @classmethod
     async def get_user_weekly_stats(cls, auth):
         client = await cls.get_authed_client(auth=auth)
-        # Fitbit client is sync, so these calls are blocking.
-        # In a real async app, these should be run in an executor.
+        fitbit_user_id = await cls._get_provider_user_id(client, auth)
+
+        # Fitbit days are the user's local days, past midnight UTC it is still yesterday in the US
+        tz = await cls._get_user_timezone(client, fitbit_user_id)
+        today = utc_now().astimezone(tz).date()
+        days = [today - timedelta(days=offset) for offset in reversed(range(cls.config.weekly_days))]
+        resources = ["minutesFairlyActive", "minutesVeryActive", "steps", "distance"]
+        closed_days = await FitbitStatsCache.get_closed_days(fitbit_user_id, resources, days[0], days[-1])
+
+        fairly_active, very_active, steps, distance = await asyncio.gather(
+            *(
+                cls._get_cached_time_series(client, fitbit_user_id, resource, days, closed_days[resource])
+                for resource in resources
+            )
+        )
         return UserWeeklyStats(
             user_id=auth.user_id,
-            fairly_active=cls._get_time_series(client, "minutesFairlyActive"),
-            very_active=cls._get_time_series(client, "minutesVeryActive"),
-            steps=cls._get_time_series(client, "steps"),
-            distance=cls._get_time_series(client, "distance"),
+            fairly_active=fairly_active,
+            very_active=very_active,
+            steps=steps,
+            distance=distance,
         )
 
     @classmethod
     async def get_registered_guild_ids(cls):
-        async for session in get_session():
-            stmt = select(ThirdPartyAuth.guild_id).where(ThirdPartyAuth.provider == FitbotConfig.provider).distinct()
-            result = await session.exec(stmt)
-            return list(result.all())
+        return await cls.auths.get_guild_ids(FitbotConfig.provider)
 
 
 @attr.s
@@ -287,17 +477,20 @@ class FitbitTokenRefresher:
     # Shared thread pool for all token refresh operations
     _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="fitbit_token_refresh")
 
-    def __init__(self, user_id: str, guild_id: str, provider: str):
+    def __init__(self, user_id: str, guild_id: str, provider: str, loop: asyncio.AbstractEventLoop):
         """Store only the identifiers needed to update the database.
 
         Args:
             user_id: Discord user ID
             guild_id: Discord guild ID
             provider: Auth provider name (e.g., 'fitbit')
+            loop: Event loop to schedule the database update on, since the
+                callback fires from a fetch worker thread
         """
         self.user_id = user_id
         self.guild_id = guild_id
         self.provider = provider
+        self.loop = loop
 
     def __call__(self, new_token: dict):
         """Called by Fitbit library when tokens are refreshed.
@@ -310,14 +503,12 @@ class FitbitTokenRefresher:
         # Schedule the update to run in the background
         # We use asyncio.run_coroutine_threadsafe to safely schedule from sync code
         try:
-            loop = asyncio.get_running_loop()
-            # Schedule the coroutine in the event loop from this thread
-            asyncio.run_coroutine_threadsafe(self._update_token(new_token), loop)
+            asyncio.run_coroutine_threadsafe(self._update_token(new_token), self.loop)
         except RuntimeError:
-            # No running loop - this shouldn't happen in a Discord bot,
+            # Loop already closed - this shouldn't happen in a Discord bot,
             # but log it if it does
             logging.error(
-                f"No running event loop found when refreshing token for user {self.user_id}. "
+                f"Event loop unavailable when refreshing token for user {self.user_id}. "
                 "Token refresh will not be saved to database."
             )
 
@@ -339,13 +530,10 @@ class FitbitTokenRefresher:
                 auth = result.first()
 
                 if auth:
-                    # Update the tokens
-                    auth.access_token = new_token["access_token"]
-                    auth.refresh_token = new_token["refresh_token"]
-                    auth.expires_at = datetime.fromtimestamp(new_token["expires_at"])
-
+                    apply_token(auth, new_token)
                     session.add(auth)
                     await session.commit()
+                    await FitbotService.auths.put(auth)
 
                     logging.info(f"Successfully updated tokens for user {self.user_id}")
                 else:
@@ -0,0 +1,77 @@
+from datetime import datetime, time, timedelta, timezone
+
+from sqlmodel import select
+
+from pyWeastCoastBot.db.models import FitbitDailyStat
+from pyWeastCoastBot.db.session import get_session
+from pyWeastCoastBot.db.utils import upsert
+from pyWeastCoastBot.lib.fitbot.config import FitbotConfig
+from pyWeastCoastBot.utils.time import ensure_utc, utc_now
+
+
+class FitbitStatsCache:
+    """Persistent per-day cache of Fitbit time series values.
+
+    Values are keyed on the Fitbit account rather than the Discord user, so a
+    user registered in several guilds is only fetched once. A day's value is
+    final once it was fetched a while after the day ended; until then it is
+    treated as missing and refetched.
+    """
+
+    @staticmethod
+    def is_closed(stat: FitbitDailyStat) -> bool:
+        day_end = datetime.combine(stat.day + timedelta(days=1), time(), tzinfo=timezone.utc)
+        return ensure_utc(stat.fetched_at) >= day_end + FitbotConfig.stats_final_after
+
+    @classmethod
+    async def get_closed_days(cls, fitbit_user_id, resources, start, end):
+        """Load the cached values that no longer need refreshing.
+
+        Args:
+            fitbit_user_id: Fitbit account id
+            resources: Time series resource names (e.g. 'steps')
+            start: First day of the window (inclusive)
+            end: Last day of the window (inclusive)
+
+        Returns:
+            dict: resource -> {day: value} of closed days in the window
+        """
+        closed = {resource: {} for resource in resources}
+        async for session in get_session():
+            stmt = select(FitbitDailyStat).where(
+                FitbitDailyStat.fitbit_user_id == fitbit_user_id,
+                FitbitDailyStat.resource.in_(resources),
+                FitbitDailyStat.day >= start,
+                FitbitDailyStat.day <= end,
+            )
+            result = await session.exec(stmt)
+            for stat in result.all():
+                if cls.is_closed(stat):
+                    closed[stat.resource][stat.day] = stat.value
+        return closed
+
+    @staticmethod
+    async def store_days(fitbit_user_id, resource, values):
+        """Upsert fetched values for a resource.
+
+        Args:
+            fitbit_user_id: Fitbit account id
+            resource: Time series resource name
+            values: dict of {day: value}
+        """
+        if not values:
+            return
+        fetched_at = utc_now()
+        rows = [
+            dict(fitbit_user_id=fitbit_user_id, resource=resource, day=day, value=str(value), fetched_at=fetched_at)
+            for day, value in values.items()
+        ]
+        async for session in get_session():
+            await upsert(
+                session,
+                FitbitDailyStat,
+                rows,
+                index_elements=["fitbit_user_id", "resource", "day"],
+                update_fields=["value", "fetched_at"],
+            )
+            await session.commit()
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from typing import Any
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from pyWeastCoastBot.utils.metrics import track_upstream
+
+
+class HttpClient:
+    """Shared async HTTP session for upstream API calls.
+
+    Connections are kept alive and pooled across commands, with a cap on
+    concurrent connections per host. Idempotent requests are retried with
+    exponential backoff on connection errors, timeouts and throttling or
+    server error responses.
+    """
+
+    total_connections = 32
+    connections_per_host = 8
+    dns_cache_seconds = 300
+    timeout_seconds = 10
+    max_retries = 2
+    backoff_seconds = 0.5
+    # Longer Retry-After waits than this fail the request instead, a command can't wait that long
+    max_retry_after_seconds = 10
+    retry_statuses = {429, 500, 502, 503, 504}
+    retry_methods = {"GET", "HEAD"}
+    headers = {"User-Agent": "pyWeastCoastBot (https://github.com/ejnarvala/pyWeastCoastBot)"}
+
+    _session: aiohttp.ClientSession | None = None
+
+    @classmethod
+    async def start(cls):
+        if cls._session is not None and not cls._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=cls.total_connections,
+            limit_per_host=cls.connections_per_host,
+            ttl_dns_cache=cls.dns_cache_seconds,
+        )
+        cls._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=cls.timeout_seconds),
+            headers=cls.headers,
+        )
+        logging.info("HTTP client session started")
+
+    @classmethod
+    async def close(cls):
+        if cls._session is not None and not cls._session.closed:
+            await cls._session.close()
+            logging.info("HTTP client session closed")
+        cls._session = None
+
+    @classmethod
+    async def session(cls) -> aiohttp.ClientSession:
+        # Started with the bot, but lazily start it for anything that runs outside it
+        await cls.start()
+        return cls._session
+
+    @classmethod
+    def _retry_delay(cls, attempt, response=None):
+        """Seconds to wait before retrying, None if the server asked for longer than we'll wait."""
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = float(retry_after)
+            return delay if delay <= cls.max_retry_after_seconds else None
+        return cls.backoff_seconds * 2**attempt
+
+    @classmethod
+    async def request_json(cls, method, url, params=None, service=None, operation=None, **kwargs) -> Any:
+        """Make a request and decode the JSON response.
+
+        Args:
+            method: HTTP method
+            url: Request URL
+            params: Query string parameters, None values are dropped
+            service: Upstream name for metrics, defaults to the URL's host
+            operation: Operation name for metrics, defaults to the URL's path
+            **kwargs: Passed through to aiohttp.ClientSession.request
+
+        Returns:
+            Decoded JSON body
+
+        Raises:
+            aiohttp.ClientResponseError: Response status was an error after retries
+            aiohttp.ClientError: Connection failed after retries
+            TimeoutError: Request timed out after retries
+        """
+        split_url = urlsplit(url)
+        # Retries are part of the call's latency, one failure is counted once they run out
+        with track_upstream(service or split_url.hostname, operation or split_url.path or "/"):
+            return await cls._request_json(method, url, params, **kwargs)
+
+    @classmethod
+    async def _request_json(cls, method, url, params, **kwargs):
+        method = method.upper()
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        retries = cls.max_retries if method in cls.retry_methods else 0
+        session = await cls.session()
+
+        for attempt in range(retries + 1):
+            delay = None
+            try:
+                async with session.request(method, url, params=params, **kwargs) as response:
+                    if response.status in cls.retry_statuses and attempt < retries:
+                        delay = cls._retry_delay(attempt, response)
+                        if delay is not None:
+                            logging.warning(f"{method} {url} returned {response.status}, retrying in {delay}s")
+                        else:
+                            logging.warning(
+                                f"{method} {url} returned {response.status} with Retry-After "
+                                f"{response.headers['Retry-After']}s, not retrying"
+                            )
+                    if delay is None:
+                        response.raise_for_status()
+                        return await response.json(content_type=None)
+            except (aiohttp.ClientConnectionError, TimeoutError) as e:
+                if attempt >= retries:
+                    raise
+                delay = cls._retry_delay(attempt)
+                logging.warning(f"{method} {url} failed ({e!r}), retrying in {delay}s")
+            # Waited out after the response is released, so a retry doesn't hold a pooled connection meanwhile
+            await asyncio.sleep(delay)
+
+    @classmethod
+    async def get_json(cls, url, params=None, service=None, operation=None, **kwargs) -> Any:
+        return await cls.request_json("GET", url, params=params, service=service, operation=operation, **kwargs)
@@ -0,0 +1,144 @@
+import json
+import logging
+from datetime import timedelta
+
+from sqlmodel import select
+
+from pyWeastCoastBot import config
+from pyWeastCoastBot.db.models import OmdbCacheEntry
+from pyWeastCoastBot.db.session import get_session
+from pyWeastCoastBot.db.utils import upsert
+from pyWeastCoastBot.utils.cache import CacheStats, TTLCache
+from pyWeastCoastBot.utils.time import ensure_utc, utc_now
+
+
+class OmdbCache:
+    """Response cache for OMDb film lookups.
+
+    Responses are stored once per film under its IMDb ID, with an alias index
+    from each search that resolved to it, so a title search and a lookup by
+    the ID it returned share an entry. Misses like "Movie not found!" are
+    cached briefly so repeated typos don't spend the daily quota. Responses
+    are optionally persisted to the database so the cache survives restarts.
+    """
+
+    # Errors that mean the search itself has no result, rather than a request problem
+    not_found_errors = {"Movie not found!", "Incorrect IMDb ID."}
+
+    def __init__(
+        self,
+        max_entries=512,
+        ttl_seconds=24 * 60 * 60,
+        not_found_max_entries=256,
+        not_found_ttl_seconds=10 * 60,
+        persist=config.OMDB_CACHE_PERSIST,
+        persist_ttl=timedelta(days=7),
+    ):
+        self._responses = TTLCache(max_entries, ttl_seconds)
+        self._aliases = TTLCache(max_entries * 2, ttl_seconds)
+        self._not_found = TTLCache(not_found_max_entries, not_found_ttl_seconds)
+        self.persist = persist
+        self.persist_ttl = persist_ttl
+        self.stats = CacheStats()
+        self.not_found_hits = 0
+        self.persisted_hits = 0
+
+    @staticmethod
+    def query_key(title=None, imdb_id=None, year=None):
+        # OMDb ignores the title and year when given an ID
+        if imdb_id:
+            return f"id:{imdb_id.strip().lower()}"
+        title = " ".join(title.casefold().split())
+        return f"title:{title}:{year or ''}"
+
+    def get_not_found(self, key):
+        """Return the cached not found error for a query, if any."""
+        error = self._not_found.get(key)
+        if error is not None:
+            self.not_found_hits += 1
+        return error
+
+    def set_not_found(self, key, error):
+        if error in self.not_found_errors:
+            self._not_found.set(key, error)
+
+    async def get(self, key):
+        """Look up the OMDb response for a query key.
+
+        Returns:
+            dict: Cached response JSON, or None on a miss
+        """
+        response_json = self._get_in_memory(key)
+        if response_json is None and self.persist:
+            response_json = await self._get_persisted(key)
+            if response_json is not None:
+                self.persisted_hits += 1
+                self._set_in_memory(key, response_json)
+
+        if response_json is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return response_json
+
+    async def set(self, key, response_json):
+        self._set_in_memory(key, response_json)
+        if self.persist:
+            await self._persist(key, response_json)
+
+    @property
+    def stats_summary(self):
+        return dict(
+            hits=self.stats.hits,
+            misses=self.stats.misses,
+            hit_rate=round(self.stats.hit_rate, 3),
+            not_found_hits=self.not_found_hits,
+            persisted_hits=self.persisted_hits,
+            entries=len(self._responses),
+            evictions=self._responses.stats.evictions,
+        )
+
+    def _get_in_memory(self, key):
+        id_key = self._aliases.get(key, key)
+        return self._responses.get(id_key)
+
+    def _set_in_memory(self, key, response_json):
+        id_key = self.query_key(imdb_id=response_json["imdbID"])
+        self._responses.set(id_key, response_json)
+        if key != id_key:
+            self._aliases.set(key, id_key)
+
+    async def _get_persisted(self, key):
+        try:
+            async for session in get_session():
+                stmt = select(OmdbCacheEntry).where(OmdbCacheEntry.query_key == key)
+                result = await session.exec(stmt)
+                entry = result.first()
+        except Exception as e:
+            logging.error(f"Failed to read OMDb cache entry {key}: {e}")
+            return None
+
+        if entry is None or ensure_utc(entry.fetched_at) < utc_now() - self.persist_ttl:
+            return None
+        return json.loads(entry.response_json)
+
+    async def _persist(self, key, response_json):
+        imdb_id = response_json["imdbID"]
+        keys = {key, self.query_key(imdb_id=imdb_id)}
+        fetched_at = utc_now()
+        rows = [
+            dict(query_key=k, imdb_id=imdb_id, response_json=json.dumps(response_json), fetched_at=fetched_at)
+            for k in keys
+        ]
+        try:
+            async for session in get_session():
+                await upsert(
+                    session,
+                    OmdbCacheEntry,
+                    rows,
+                    index_elements=["query_key"],
+                    update_fields=["imdb_id", "response_json", "fetched_at"],
+                )
+                await session.commit()
+        except Exception as e:
+            logging.error(f"Failed to persist OMDb cache entry {key}: {e}")
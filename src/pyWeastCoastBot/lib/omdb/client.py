@@ -1,37 +1,48 @@
 import logging
 from typing import Dict
 
-import requests
-
 from pyWeastCoastBot import config
+from pyWeastCoastBot.lib.http.client import HttpClient
+from pyWeastCoastBot.lib.omdb.cache import OmdbCache
 from pyWeastCoastBot.lib.omdb.imdb_file import ImdbFilm
 
 
 class OmdbClient(object):
     api_key = config.OMDB_API_SECRET
     base_url = "http://www.omdbapi.com"
+    cache = OmdbCache()
 
     @classmethod
-    def _request(cls, path="", params=dict(), method="GET", **kwargs) -> Dict:
+    async def _request(cls, path="", params=None, method="GET", operation="request", **kwargs) -> Dict:
         url = f"{cls.base_url}/{path}"
 
-        params.update(dict(apikey=config.OMDB_API_SECRET))
-
-        response = requests.request(method=method, url=url, params=params, **kwargs)
-
-        response.raise_for_status()
+        params = dict(params or {}, apikey=config.OMDB_API_SECRET)
 
-        response_json = response.json()
+        response_json = await HttpClient.request_json(
+            method, url, params=params, service="omdb", operation=operation, **kwargs
+        )
         logging.debug(f"OMDB Response: {response_json}")
         if response_json["Response"] == "False":
             raise OmdbError(response_json["Error"])
         return response_json
 
     @classmethod
-    def find_by_title_or_id(cls, title, imdb_id, year) -> ImdbFilm:
-        params = dict(t=title, i=imdb_id, y=year)
-        params = {k: v for k, v in params.items() if v}
-        response_json = cls._request(params=params)
+    async def find_by_title_or_id(cls, title, imdb_id, year) -> ImdbFilm:
+        cache_key = cls.cache.query_key(title=title, imdb_id=imdb_id, year=year)
+        not_found_error = cls.cache.get_not_found(cache_key)
+        if not_found_error:
+            raise OmdbError(not_found_error)
+
+        response_json = await cls.cache.get(cache_key)
+        if response_json is None:
+            params = dict(t=title, i=imdb_id, y=year)
+            params = {k: v for k, v in params.items() if v}
+            try:
+                response_json = await cls._request(params=params, operation="by_id" if imdb_id else "by_title")
+            except OmdbError as e:
+                cls.cache.set_not_found(cache_key, str(e))
+                raise
+            await cls.cache.set(cache_key, response_json)
         return ImdbFilm.from_json(response_json)
 
 
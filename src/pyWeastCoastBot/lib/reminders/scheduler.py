@@ -0,0 +1,64 @@
+import asyncio
+import heapq
+import logging
+
+from sqlmodel import select
+
+from pyWeastCoastBot.db.models import Reminder
+from pyWeastCoastBot.db.session import get_session
+from pyWeastCoastBot.utils.time import ensure_utc, utc_now
+
+
+class ReminderScheduler:
+    """In-process min-heap of upcoming reminder times.
+
+    The database stays the source of truth for what gets delivered. The heap
+    only tracks when the next reminder is due, so the delivery loop can sleep
+    until then instead of querying on a fixed interval.
+    """
+
+    # Cap on a single sleep so wall clock jumps (e.g. NTP sync after boot on the Pi) can't strand a reminder
+    max_sleep_seconds = 300
+    retry_seconds = 30
+
+    def __init__(self):
+        self._remind_times = []
+        self._wakeup = asyncio.Event()
+
+    async def load(self):
+        """Load every pending reminder time from the database."""
+        async for session in get_session():
+            result = await session.exec(select(Reminder.remind_time))
+            self._remind_times = [ensure_utc(remind_time) for remind_time in result.all()]
+        heapq.heapify(self._remind_times)
+        logging.info(f"Loaded {len(self._remind_times)} pending reminders")
+        self._wakeup.set()
+
+    def schedule(self, remind_time):
+        """Track a newly created reminder, waking the sleeper if it's now the earliest."""
+        remind_time = ensure_utc(remind_time)
+        heapq.heappush(self._remind_times, remind_time)
+        if self._remind_times[0] == remind_time:
+            self._wakeup.set()
+
+    async def wait_until_due(self):
+        """Sleep until at least one scheduled reminder is due."""
+        while True:
+            self._wakeup.clear()
+            timeout = None
+            if self._remind_times:
+                delay = (self._remind_times[0] - utc_now()).total_seconds()
+                if delay <= 0:
+                    self._pop_due()
+                    return
+                timeout = min(delay, self.max_sleep_seconds)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except TimeoutError:
+                pass
+
+    def _pop_due(self):
+        now = utc_now()
+        while self._remind_times and self._remind_times[0] <= now:
+            heapq.heappop(self._remind_times)
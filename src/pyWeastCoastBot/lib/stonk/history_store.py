@@ -0,0 +1,322 @@
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import attr
+import numpy as np
+
+from pyWeastCoastBot.lib.stonk.stonk_intervals import StonkIntervals
+from pyWeastCoastBot.lib.stonk.stonk_periods import StonkPeriods
+from pyWeastCoastBot.utils.cache import SingleFlight, TTLCache
+from pyWeastCoastBot.utils.lazy_import import lazy_import
+from pyWeastCoastBot.utils.metrics import track_upstream
+
+pd = lazy_import("pandas")
+yf = lazy_import("yfinance")
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+# One row per bar, bar start times in nanoseconds since the epoch (UTC)
+BAR_DTYPE = np.dtype([("time", "i8")] + [(column, "f8") for column in OHLCV_COLUMNS])
+# Characters kept from a symbol in its file name, e.g. ^GSPC, BRK-B, EURUSD=X
+UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Z0-9.^=-]")
+
+# Periods counted in trading sessions rather than calendar time, like yfinance does
+SESSION_PERIODS = {
+    StonkPeriods.one_day: 1,
+    StonkPeriods.five_day: 5,
+}
+# pd.DateOffset arguments
+CALENDAR_PERIODS = {
+    StonkPeriods.one_month: dict(months=1),
+    StonkPeriods.three_month: dict(months=3),
+    StonkPeriods.six_month: dict(months=6),
+    StonkPeriods.one_year: dict(years=1),
+    StonkPeriods.two_year: dict(years=2),
+    StonkPeriods.five_year: dict(years=5),
+    StonkPeriods.ten_year: dict(years=10),
+}
+# How far back yfinance serves intraday bars. Older ones are trimmed as the tail is extended, a full
+# download wouldn't return them either, so the entry still covers what it did.
+INTRADAY_RETENTION = {
+    StonkIntervals.one_minute: timedelta(days=30),
+    StonkIntervals.two_minute: timedelta(days=60),
+    StonkIntervals.five_minute: timedelta(days=60),
+    StonkIntervals.fifteen_minute: timedelta(days=60),
+    StonkIntervals.thirty_minute: timedelta(days=60),
+    StonkIntervals.ninety_minute: timedelta(days=60),
+    StonkIntervals.sixty_minute: timedelta(days=730),
+    StonkIntervals.one_hour: timedelta(days=730),
+}
+
+
+def _period_start(period, now):
+    """Earliest bar time a calendar period covers, None for all history."""
+    if period == StonkPeriods.max_period:
+        return None
+    if period == StonkPeriods.year_to_date:
+        return pd.Timestamp(year=now.year, month=1, day=1, tz="UTC")
+    return now - pd.DateOffset(**CALENDAR_PERIODS[period])
+
+
+def _sizeof(entry):
+    return entry.bars.nbytes
+
+
+def _to_index(times, tz):
+    return pd.DatetimeIndex(np.asarray(times).astype("datetime64[ns]")).tz_localize("UTC").tz_convert(tz)
+
+
+def _to_records(frame):
+    """BAR_DTYPE rows and the timezone of a yfinance history frame."""
+    if frame.empty:
+        return np.empty(0, dtype=BAR_DTYPE), "UTC"
+    index = frame.index
+    bars = np.empty(len(frame), dtype=BAR_DTYPE)
+    bars["time"] = index.tz_convert("UTC").tz_localize(None).to_numpy("datetime64[ns]").view("i8")
+    for column in OHLCV_COLUMNS:
+        bars[column] = frame[column].to_numpy(dtype=float) if column in frame.columns else np.nan
+    return bars, str(index.tz)
+
+
+def _replace_file(path, write):
+    """Write a file next to ``path`` and move it into place, so readers never see it half written."""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            write(file)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+@attr.s(frozen=True)
+class HistoryEntry:
+    """Contiguous bars for one symbol and interval, from ``covers_from`` up to the last refresh."""
+
+    # BAR_DTYPE array, memory mapped when the store keeps its bars on disk
+    bars = attr.ib()
+    # Exchange timezone, sessions are counted in it
+    tz = attr.ib()
+    # None when the bars go back to the start of the symbol's history
+    covers_from = attr.ib()
+    refreshed_at = attr.ib()
+
+    @property
+    def empty(self):
+        return len(self.bars) == 0
+
+    def _last_sessions(self, sessions):
+        """Index of the first bar of the last ``sessions`` sessions, and how many there were.
+
+        Walks back a session at a time from the newest bar, so only a few rows near each session start
+        are read rather than the whole file.
+        """
+        times = self.bars["time"]
+        start = len(times)
+        found = 0
+        while start > 0 and found < sessions:
+            session_day = pd.Timestamp(int(times[start - 1]), tz="UTC").tz_convert(self.tz).normalize()
+            start = int(np.searchsorted(times[:start], session_day.value))
+            found += 1
+        return start, found
+
+    def covers(self, period, now):
+        if self.covers_from is None:
+            return True
+        if period in SESSION_PERIODS:
+            return self._last_sessions(SESSION_PERIODS[period])[1] >= SESSION_PERIODS[period]
+        if period == StonkPeriods.max_period:
+            return False
+        return self.covers_from <= _period_start(period, now)
+
+    def slice(self, period, now):
+        """Frame of the bars in a period, like yfinance's history. Only those rows are read from disk."""
+        bars = self.bars
+        if period in SESSION_PERIODS:
+            # A new listing may have fewer sessions than the period asks for, then it starts at the first bar
+            bars = bars[self._last_sessions(SESSION_PERIODS[period])[0] :]
+        else:
+            start = _period_start(period, now)
+            if start is not None:
+                bars = bars[np.searchsorted(bars["time"], start.value) :]
+        return pd.DataFrame(
+            {column: np.array(bars[column]) for column in OHLCV_COLUMNS},
+            index=_to_index(bars["time"], self.tz),
+        )
+
+
+class HistoryStore:
+    """Incrementally updated OHLC bars per symbol and interval.
+
+    Past candles don't change, so once a period has been downloaded later
+    requests only fetch the tail since the last stored bar (which is
+    refetched, it may have been partial) and are served by slicing the
+    stored bars. Any request for a longer window than is stored downloads
+    that whole window again and replaces the entry. If the overlapping bar
+    doesn't match, e.g. prices were split or dividend adjusted since, the
+    entry is also downloaded again in full.
+
+    With a ``directory``, bars are saved there as one .npy file per symbol
+    and interval, and read back memory mapped, so they survive restarts and
+    a request only pages in the rows it slices. Without one they are kept
+    in memory.
+    """
+
+    def __init__(self, directory=None, max_bytes=64 * 1024 * 1024, idle_ttl_seconds=24 * 60 * 60, clock=time.monotonic):
+        self.directory = Path(directory) if directory else None
+        # Open entries, memory mapped ones only count against max_bytes by their mapped size
+        self._entries = TTLCache(max_bytes=max_bytes, sizeof=_sizeof, ttl_seconds=idle_ttl_seconds)
+        self._in_flight = SingleFlight()
+        self._clock = clock
+        self.full_fetches = 0
+        self.tail_fetches = 0
+
+    @property
+    def cache(self):
+        return self._entries
+
+    def get(self, symbol, period, interval, max_age_seconds):
+        """Get the bars for a period, refreshing the stored tail if older than ``max_age_seconds``."""
+        key = (symbol, interval)
+        now = pd.Timestamp.now(tz="UTC")
+        entry = self._get_entry(symbol, interval)
+        if entry is None or not entry.covers(period, now) or self._is_stale(entry, max_age_seconds):
+            entry = self._in_flight.do(key, self._refresh, symbol, period, interval, max_age_seconds)
+            # Joining a refresh in flight returns the leader's entry, which may be for a shorter period.
+            # Keyed by period as well, so this retry can't join another shorter one.
+            if not entry.covers(period, now):
+                entry = self._in_flight.do(key + (period,), self._refresh, symbol, period, interval, max_age_seconds)
+        return entry.slice(period, now)
+
+    def _is_stale(self, entry, max_age_seconds):
+        return self._clock() - entry.refreshed_at >= max_age_seconds
+
+    def _get_entry(self, symbol, interval):
+        key = (symbol, interval)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._load(symbol, interval)
+            if entry is not None:
+                self._entries.set(key, entry)
+        return entry
+
+    def _refresh(self, symbol, period, interval, max_age_seconds):
+        key = (symbol, interval)
+        now = pd.Timestamp.now(tz="UTC")
+        # Another caller may have refreshed it while this one waited
+        entry = self._get_entry(symbol, interval)
+        if entry is not None and entry.covers(period, now):
+            if not self._is_stale(entry, max_age_seconds):
+                return entry
+            entry = self._extend(symbol, interval, entry)
+            if entry is not None:
+                entry = self._save(symbol, interval, entry)
+                self._entries.set(key, entry)
+                return entry
+
+        entry = self._download(symbol, period, interval, now)
+        if not entry.empty:
+            entry = self._save(symbol, interval, entry)
+            self._entries.set(key, entry)
+        return entry
+
+    def _download(self, symbol, period, interval, now):
+        self.full_fetches += 1
+        with track_upstream("yfinance", "history"):
+            frame = yf.Ticker(symbol).history(period=period.value, interval=interval.value)
+        bars, tz = _to_records(frame)
+
+        if period == StonkPeriods.max_period:
+            covers_from = None
+        elif period in SESSION_PERIODS or frame.empty:
+            covers_from = frame.index[0] if not frame.empty else now
+        else:
+            covers_from = _period_start(period, now)
+        return HistoryEntry(bars=bars, tz=tz, covers_from=covers_from, refreshed_at=self._clock())
+
+    def _extend(self, symbol, interval, entry):
+        """Append the bars since the entry's last one, None if it needs a full download instead."""
+        self.tail_fetches += 1
+        last_bar = pd.Timestamp(int(entry.bars["time"][-1]), tz="UTC").tz_convert(entry.tz)
+        try:
+            with track_upstream("yfinance", "history_tail"):
+                frame = yf.Ticker(symbol).history(start=last_bar, interval=interval.value)
+        except Exception as e:
+            logging.warning(f"Fetching {symbol} {interval.value} bars since {last_bar} failed: {e}")
+            return None
+
+        tail, _ = _to_records(frame)
+        if len(tail) == 0:
+            return attr.evolve(entry, refreshed_at=self._clock())
+        if tail["time"][0] != entry.bars["time"][-1] or not np.isclose(tail["Open"][0], entry.bars["Open"][-1]):
+            logging.info(f"Stored {symbol} {interval.value} bars don't line up with the latest, downloading again")
+            return None
+
+        bars = entry.bars[:-1]
+        if interval in INTRADAY_RETENTION:
+            cutoff = pd.Timestamp.now(tz="UTC") - INTRADAY_RETENTION[interval]
+            bars = bars[np.searchsorted(bars["time"], cutoff.value) :]
+        bars = np.concatenate([bars, tail])
+        return attr.evolve(entry, bars=bars, refreshed_at=self._clock())
+
+    def _path(self, symbol, interval):
+        return self.directory / interval.value / f"{UNSAFE_FILENAME_CHARS.sub('_', symbol)}.npy"
+
+    def _save(self, symbol, interval, entry):
+        """Write an entry's bars to disk, returning it with them memory mapped from there."""
+        if self.directory is None:
+            return entry
+        path = self._path(symbol, interval)
+        metadata = dict(
+            tz=entry.tz,
+            covers_from=None if entry.covers_from is None else entry.covers_from.value,
+            rows=len(entry.bars),
+            last_time=int(entry.bars["time"][-1]),
+        )
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _replace_file(path, lambda file: np.save(file, entry.bars))
+            # Written second, a load only trusts bars that match it
+            _replace_file(path.with_suffix(".json"), lambda file: file.write(json.dumps(metadata).encode()))
+            bars = np.load(path, mmap_mode="r")
+        except OSError as e:
+            logging.warning(f"Saving {symbol} {interval.value} bars to {path} failed, keeping them in memory: {e}")
+            return entry
+        return attr.evolve(entry, bars=bars)
+
+    def _load(self, symbol, interval):
+        if self.directory is None:
+            return None
+        path = self._path(symbol, interval)
+        try:
+            metadata = json.loads(path.with_suffix(".json").read_text())
+            bars = np.load(path, mmap_mode="r")
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Reading stored {symbol} {interval.value} bars from {path} failed: {e}")
+            return None
+
+        if (
+            bars.dtype != BAR_DTYPE
+            or len(bars) == 0
+            or len(bars) != metadata.get("rows")
+            or int(bars["time"][-1]) != metadata.get("last_time")
+        ):
+            logging.warning(f"Stored {symbol} {interval.value} bars don't match their metadata, ignoring them")
+            return None
+        covers_from = metadata["covers_from"]
+        return HistoryEntry(
+            bars=bars,
+            tz=metadata["tz"],
+            covers_from=None if covers_from is None else pd.Timestamp(covers_from, tz="UTC"),
+            # Age unknown, so the first request after a restart fetches the tail since the last bar
+            refreshed_at=-math.inf,
+        )
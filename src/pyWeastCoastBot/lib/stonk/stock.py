@@ -1,10 +1,10 @@
-from functools import cached_property
-
 import attr
-import pandas as pd
+import numpy as np
 
-from pyWeastCoastBot.utils.graph import generate_line_plot_image
-from pyWeastCoastBot.utils.math import get_percent_change
+from pyWeastCoastBot.utils.chart_renderer import LinePlotPayload
+from pyWeastCoastBot.utils.errors import NotFound
+from pyWeastCoastBot.utils.graph import WIDTH_PX
+from pyWeastCoastBot.utils.math import get_percent_change, min_max_downsample
 
 
 @attr.s
@@ -61,32 +61,108 @@ class StockHistory:
     market_change_percentage = attr.ib()
     start_date = attr.ib()
     end_date = attr.ib()
-    _data = attr.ib()
+    # Downsampled mid price for the chart, UTC times and float32 prices
+    _times = attr.ib()
+    _prices = attr.ib()
+
+    # Points kept for the chart, about two per pixel
+    max_chart_points = 2 * WIDTH_PX
 
-    @cached_property
-    def price_graph_image(self):
-        history = self._data
-        price = (history["High"] + history["Low"]) / 2
-        df = pd.DataFrame(dict(price=price, time=history.index))
-        return generate_line_plot_image(df, x="time", y="price", labels=dict(time="Time", price="Price (USD)"))
+    @property
+    def price_graph_payload(self):
+        return LinePlotPayload(
+            x=self._times,
+            series=(("Price (USD)", self._prices),),
+            xlabel="Time",
+            ylabel="Price (USD)",
+        )
 
     @staticmethod
     def from_yf_ticker_history(history):
-        first_entry = history.iloc[0]
-        last_entry = history.iloc[-1]
+        opens = history["Open"].to_numpy(dtype=float)
+        highs = history["High"].to_numpy(dtype=float)
+        lows = history["Low"].to_numpy(dtype=float)
+        closes = history["Close"].to_numpy(dtype=float)
 
-        first_open = first_entry["Open"]
-        last_close = last_entry["Close"]
+        first_open = opens[0]
+        last_close = closes[-1]
         market_change = last_close - first_open
         market_change_percentage = get_percent_change(current=last_close, previous=first_open)
+
+        index = history.index
+        times = (index.tz_convert("UTC").tz_localize(None) if index.tz is not None else index).to_numpy(
+            "datetime64[ns]"
+        )
+        times, prices = min_max_downsample(times, (highs + lows) / 2, StockHistory.max_chart_points)
         return StockHistory(
-            high=history["High"].max(),
-            low=history["Low"].min(),
+            high=np.nanmax(highs),
+            low=np.nanmin(lows),
             first_open=first_open,
             last_close=last_close,
             market_change=market_change,
             market_change_percentage=market_change_percentage,
-            start_date=first_entry.name.to_pydatetime(),
-            end_date=last_entry.name.to_pydatetime(),
-            data=history,
+            start_date=index[0].to_pydatetime(),
+            end_date=index[-1].to_pydatetime(),
+            times=times,
+            prices=prices.astype(np.float32),
+        )
+
+
+@attr.s
+class StockComparison:
+    symbols = attr.ib()
+    last_closes = attr.ib()
+    # Percent change from each symbol's first close over the period
+    changes = attr.ib()
+    start_date = attr.ib()
+    end_date = attr.ib()
+    # Symbols yfinance had no data for
+    missing = attr.ib(factory=list)
+    _times = attr.ib(default=None)
+    _change_series = attr.ib(default=None)
+
+    max_chart_points = 2 * WIDTH_PX
+
+    @property
+    def price_graph_payload(self):
+        return LinePlotPayload(
+            x=self._times,
+            series=tuple(zip(self.symbols, self._change_series)),
+            xlabel="Time",
+            ylabel="Change (%)",
+            legend_title="Ticker",
+        )
+
+    @staticmethod
+    def from_yf_closes(closes):
+        """Build from a frame of closing prices with a column per symbol, as yf.download returns."""
+        missing = [symbol for symbol in closes.columns if closes[symbol].isna().all()]
+        closes = closes.drop(columns=missing).dropna(how="all")
+        if closes.empty:
+            raise NotFound(f"No price history for {', '.join(missing)}")
+
+        values = closes.to_numpy(dtype=float)
+        first = closes.bfill().iloc[0].to_numpy(dtype=float)
+        last = closes.ffill().iloc[-1].to_numpy(dtype=float)
+        change_series = (values / first - 1) * 100
+
+        index = closes.index
+        times = (index.tz_convert("UTC").tz_localize(None) if index.tz is not None else index).to_numpy(
+            "datetime64[ns]"
+        )
+        if len(times) > StockComparison.max_chart_points:
+            # Series share the x axis, so thin them evenly rather than per series
+            keep = np.linspace(0, len(times) - 1, StockComparison.max_chart_points).astype(int)
+            times, change_series = times[keep], change_series[keep]
+
+        symbols = list(closes.columns)
+        return StockComparison(
+            symbols=symbols,
+            last_closes=dict(zip(symbols, last)),
+            changes=dict(zip(symbols, (last / first - 1) * 100)),
+            start_date=index[0].to_pydatetime(),
+            end_date=index[-1].to_pydatetime(),
+            missing=missing,
+            times=times,
+            change_series=tuple(change_series[:, i].astype(np.float32) for i in range(len(symbols))),
         )
@@ -1,37 +1,131 @@
 import logging
-import time
-from functools import lru_cache
+import pickle
+import re
 
-import yfinance as yf
+from pyWeastCoastBot import config
+from pyWeastCoastBot.lib.stonk.history_store import HistoryStore
+from pyWeastCoastBot.lib.stonk.stock import StockComparison, StockHistory, StockInfo
+from pyWeastCoastBot.lib.stonk.stonk_intervals import StonkIntervals
+from pyWeastCoastBot.utils.cache import SingleFlight, TTLCache
+from pyWeastCoastBot.utils.errors import InvalidParameter
+from pyWeastCoastBot.utils.lazy_import import lazy_import
+from pyWeastCoastBot.utils.metrics import track_upstream
 
-from pyWeastCoastBot.lib.stonk.stock import StockHistory, StockInfo
+yf = lazy_import("yfinance")
+
+
+def _sizeof(value):
+    return len(pickle.dumps(value))
 
 
 class StonkService:
-    @classmethod
-    @lru_cache
-    def _get_cached_history(cls, ticker, ttl_hash, **params):
-        del ttl_hash
-        return ticker.history(**params)
+    # Intraday bars go stale quickly, daily and longer bars barely move
+    history_ttl_seconds = {
+        StonkIntervals.one_minute: 30,
+        StonkIntervals.two_minute: 60,
+        StonkIntervals.five_minute: 2 * 60,
+        StonkIntervals.fifteen_minute: 5 * 60,
+        StonkIntervals.thirty_minute: 10 * 60,
+        StonkIntervals.sixty_minute: 15 * 60,
+        StonkIntervals.ninety_minute: 15 * 60,
+        StonkIntervals.one_hour: 15 * 60,
+        StonkIntervals.one_day: 2 * 60 * 60,
+        StonkIntervals.five_day: 6 * 60 * 60,
+        StonkIntervals.one_week: 6 * 60 * 60,
+        StonkIntervals.one_month: 12 * 60 * 60,
+        StonkIntervals.three_month: 12 * 60 * 60,
+    }
+    info_ttl_seconds = 60
+    max_compare_tickers = 10
 
-    @classmethod
-    @lru_cache
-    def _get_cached_info(cls, ticker, ttl_hash):
-        return ticker.info
+    _history_store = HistoryStore(directory=config.STONK_HISTORY_DIR)
+    _info_cache = TTLCache(max_bytes=2 * 1024 * 1024, sizeof=_sizeof, ttl_seconds=info_ttl_seconds)
+    _comparison_cache = TTLCache(max_bytes=8 * 1024 * 1024, sizeof=_sizeof)
+    _in_flight = SingleFlight()
 
     @staticmethod
-    def ttl_hash(seconds=1):
-        return round(time.time() / seconds)
+    def _fetch_info(symbol):
+        with track_upstream("yfinance", "info"):
+            return yf.Ticker(symbol).info
+
+    @staticmethod
+    def _fetch_closes(symbols, period, interval):
+        # One request for every symbol, yfinance fans it out over its own threads
+        with track_upstream("yfinance", "download"):
+            history = yf.download(
+                list(symbols),
+                period=period.value,
+                interval=interval.value,
+                threads=True,
+                progress=False,
+                multi_level_index=True,
+            )
+        return history["Close"].reindex(columns=list(symbols))
+
+    @classmethod
+    def _get_cached(cls, cache, key, ttl_seconds, fetch, *args):
+        value = cache.get(key)
+        if value is None:
+            value = cls._in_flight.do(key, fetch, *args)
+            cache.set(key, value, ttl_seconds=ttl_seconds)
+        return value
+
+    @classmethod
+    def cache_stats(cls):
+        stats = {
+            name: dict(
+                hits=cache.stats.hits,
+                misses=cache.stats.misses,
+                hit_rate=round(cache.stats.hit_rate, 3),
+                evictions=cache.stats.evictions,
+                expirations=cache.stats.expirations,
+                entries=len(cache),
+                bytes=cache.total_bytes,
+            )
+            for name, cache in (
+                ("history", cls._history_store.cache),
+                ("info", cls._info_cache),
+                ("comparison", cls._comparison_cache),
+            )
+        }
+        stats["history"].update(
+            full_fetches=cls._history_store.full_fetches,
+            tail_fetches=cls._history_store.tail_fetches,
+        )
+        return stats
 
     def get_stock_info(self, ticker):
-        ticker = yf.Ticker(ticker)
-        ticker_info = self._get_cached_info(ticker, ttl_hash=self.ttl_hash())
+        symbol = ticker.strip().upper()
+        ticker_info = self._get_cached(
+            self._info_cache, ("info", symbol), self.info_ttl_seconds, self._fetch_info, symbol
+        )
         logging.info(f"got ticker info: {ticker_info}")
         return StockInfo.from_yf_ticker_info(ticker_info)
 
     def get_stock_history(self, ticker, period, interval):
-        ticker = yf.Ticker(ticker)
-        history = self._get_cached_history(
-            ticker, period=period.value, interval=interval.value, ttl_hash=self.ttl_hash()
-        )
+        symbol = ticker.strip().upper()
+        history = self._history_store.get(symbol, period, interval, self.history_ttl_seconds[interval])
         return StockHistory.from_yf_ticker_history(history)
+
+    def get_stock_comparison(self, tickers, period, interval):
+        """Compare the percent change of several tickers over a period.
+
+        Args:
+            tickers: Ticker symbols, or one string of them separated by spaces or commas
+        """
+        if isinstance(tickers, str):
+            tickers = re.split(r"[\s,]+", tickers)
+        symbols = tuple(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+        if not 2 <= len(symbols) <= self.max_compare_tickers:
+            raise InvalidParameter(f"Give between 2 and {self.max_compare_tickers} tickers to compare")
+
+        closes = self._get_cached(
+            self._comparison_cache,
+            ("comparison", symbols, period, interval),
+            self.history_ttl_seconds[interval],
+            self._fetch_closes,
+            symbols,
+            period,
+            interval,
+        )
+        return StockComparison.from_yf_closes(closes)
@@ -0,0 +1,21 @@
+import csv
+from functools import cache
+from importlib import resources
+
+import attr
+
+from pyWeastCoastBot.utils.prefix_index import PrefixIndex
+
+
+@attr.s(frozen=True, slots=True)
+class TickerListing:
+    symbol = attr.ib()
+    name = attr.ib()
+
+
+@cache
+def ticker_index():
+    """Prefix index over the bundled ticker list, most popular first."""
+    with resources.files(__package__).joinpath("tickers.csv").open(newline="") as f:
+        listings = [TickerListing(symbol=row["symbol"], name=row["name"]) for row in csv.DictReader(f)]
+    return PrefixIndex(((listing.symbol, listing.name), listing) for listing in listings)
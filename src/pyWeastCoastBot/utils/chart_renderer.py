@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import attr
+import numpy as np
+
+from pyWeastCoastBot import config
+from pyWeastCoastBot.utils.cache import TTLCache
+from pyWeastCoastBot.utils.graph import generate_line_plot_image
+from pyWeastCoastBot.utils.lazy_import import lazy_import
+
+pd = lazy_import("pandas")
+
+
+def _compact_x(x_data):
+    # Same datetime coercion as generate_line_plot, done up front so only a numpy array crosses the process boundary
+    if hasattr(x_data, "dtype") and (x_data.dtype == "object" or x_data.dtype == "string"):
+        try:
+            x_data = pd.to_datetime(x_data)
+        except Exception:
+            pass
+
+    if hasattr(x_data, "dtype") and pd.api.types.is_datetime64_any_dtype(x_data):
+        index = pd.DatetimeIndex(x_data)
+        if index.tz is not None:
+            # generate_line_plot treats naive datetimes as UTC
+            index = index.tz_convert("UTC").tz_localize(None)
+        return index.to_numpy(dtype="datetime64[ns]")
+    return np.asarray(x_data)
+
+
+@attr.s(frozen=True)
+class LinePlotPayload:
+    """Compact, picklable description of a line plot: numpy arrays plus plot options."""
+
+    x = attr.ib()
+    # Tuple of (label, values) for each line
+    series = attr.ib()
+    xlabel = attr.ib(default=None)
+    ylabel = attr.ib(default=None)
+    legend_title = attr.ib(default=None)
+
+    @property
+    def fingerprint(self):
+        """Hash of the plotted data and options, identical charts share a fingerprint."""
+        digest = hashlib.blake2b(digest_size=16)
+        for array in (self.x, *(values for _, values in self.series)):
+            array = np.ascontiguousarray(array)
+            digest.update(str((array.dtype.str, array.shape)).encode())
+            digest.update(array.tobytes() if array.dtype != object else repr(array.tolist()).encode())
+        options = (tuple(label for label, _ in self.series), self.xlabel, self.ylabel, self.legend_title)
+        digest.update(repr(options).encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def from_dataframe(df, x, y, xlabel=None, ylabel=None, legend_title=None, labels=None):
+        """Build a payload from the same arguments generate_line_plot takes."""
+        labels = labels or {}
+        if isinstance(x, str) and x in labels and not xlabel:
+            xlabel = labels[x]
+        if isinstance(y, str) and y in labels and not ylabel:
+            ylabel = labels[y]
+
+        x_data = df[x] if isinstance(x, str) and x in df.columns else x
+        columns = y if isinstance(y, list) else [y]
+        series = tuple((str(labels.get(col, col)), df[col].to_numpy(dtype=float)) for col in columns)
+        return LinePlotPayload(
+            x=_compact_x(x_data),
+            series=series,
+            xlabel=xlabel,
+            ylabel=ylabel,
+            legend_title=legend_title,
+        )
+
+
+def _init_worker():
+    # Let the parent handle Ctrl+C and shut the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _render_line_plot(payload: LinePlotPayload) -> bytes:
+    # Positional column names so lines with the same label stay separate
+    columns = [f"y{i}" for i in range(len(payload.series))]
+    df = pd.DataFrame({col: values for col, (_, values) in zip(columns, payload.series)})
+    labels = {col: label for col, (label, _) in zip(columns, payload.series)}
+    x_data = pd.DatetimeIndex(payload.x) if np.issubdtype(payload.x.dtype, np.datetime64) else payload.x
+    image = generate_line_plot_image(
+        df,
+        x=x_data,
+        y=columns,
+        xlabel=payload.xlabel,
+        ylabel=payload.ylabel,
+        legend_title=payload.legend_title,
+        labels=labels,
+    )
+    return image.getvalue()
+
+
+class ChartRenderer:
+    """Renders charts on a small pool of long-lived worker processes.
+
+    Workers import matplotlib once and are reused, so several charts can
+    render in parallel on multi-core hosts without blocking the gateway
+    connection or sharing pyplot's global state. Callers queue for a slot,
+    bounded by ``max_pending``, and each render has its own timeout.
+
+    Rendered PNGs are cached by data fingerprint, so the same chart asked
+    for again (or concurrently) is rendered once. The bytes are shared, so
+    wrap each use in its own io.BytesIO rather than copying them.
+    """
+
+    workers = config.CHART_RENDER_WORKERS
+    max_pending = workers * 4
+    queue_timeout_seconds = 15
+    render_timeout_seconds = 30
+
+    _executor: ProcessPoolExecutor | None = None
+    _pending: asyncio.Semaphore | None = None
+    _cache = TTLCache(max_bytes=16 * 1024 * 1024, sizeof=len, ttl_seconds=15 * 60)
+    _in_flight: dict[str, asyncio.Future] = {}
+
+    @classmethod
+    def _get_executor(cls):
+        if cls._executor is None:
+            cls._executor = ProcessPoolExecutor(
+                max_workers=cls.workers,
+                # The bot process runs threads, so don't fork it
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return cls._executor
+
+    @classmethod
+    def close(cls):
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
+
+    @classmethod
+    def cache_stats(cls):
+        return dict(
+            hits=cls._cache.stats.hits,
+            misses=cls._cache.stats.misses,
+            hit_rate=round(cls._cache.stats.hit_rate, 3),
+            evictions=cls._cache.stats.evictions,
+            entries=len(cls._cache),
+            bytes=cls._cache.total_bytes,
+        )
+
+    @classmethod
+    async def render(cls, payload: LinePlotPayload) -> bytes:
+        """Render a line plot to PNG bytes, reusing an identical chart if one was rendered recently.
+
+        Raises:
+            TimeoutError: No render slot freed up in time, or the render took too long
+        """
+        key = payload.fingerprint
+        image = cls._cache.get(key)
+        if image is not None:
+            return image
+
+        task = cls._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(cls._render_and_cache(key, payload))
+            cls._in_flight[key] = task
+        # One caller giving up (or its interaction being cancelled) doesn't cancel the render for the rest
+        return await asyncio.shield(task)
+
+    @classmethod
+    async def _render_and_cache(cls, key, payload):
+        try:
+            image = await cls._render(payload)
+            cls._cache.set(key, image)
+            return image
+        finally:
+            del cls._in_flight[key]
+
+    @classmethod
+    async def _render(cls, payload: LinePlotPayload) -> bytes:
+        if cls._pending is None:
+            cls._pending = asyncio.Semaphore(cls.max_pending)
+        try:
+            await asyncio.wait_for(cls._pending.acquire(), timeout=cls.queue_timeout_seconds)
+        except TimeoutError:
+            raise TimeoutError("Chart renderer is busy, try again shortly")
+
+        try:
+            try:
+                job = cls._get_executor().submit(_render_line_plot, payload)
+            except BaseException:
+                cls._pending.release()
+                raise
+            # The slot is held until the worker is done with the job. A timed out render keeps drawing,
+            # releasing its slot when the wait gave up would let more renders pile onto the workers.
+            loop = asyncio.get_running_loop()
+            job.add_done_callback(lambda _: cls._release_slot(loop))
+            return await asyncio.wait_for(asyncio.wrap_future(job), timeout=cls.render_timeout_seconds)
+        except BrokenProcessPool:
+            logging.error("Chart render pool broke, restarting it")
+            cls.close()
+            raise
+
+    @classmethod
+    def _release_slot(cls, loop):
+        # Called from the executor's thread when a job finishes or is cancelled
+        try:
+            loop.call_soon_threadsafe(cls._pending.release)
+        except RuntimeError:
+            # Event loop already closed on shutdown
+            pass
@@ -1,19 +1,78 @@
 import io
-
-import matplotlib.dates as mdates
-import matplotlib.pyplot as plt
-import pandas as pd
+import threading
 
 from pyWeastCoastBot.utils.consts import HexColors
+from pyWeastCoastBot.utils.lazy_import import lazy_import
+
+# Only chart renderer workers draw, so the bot process itself never needs matplotlib
+backend_agg = lazy_import("matplotlib.backends.backend_agg", warm_up=False)
+mdates = lazy_import("matplotlib.dates", warm_up=False)
+mfigure = lazy_import("matplotlib.figure", warm_up=False)
+pd = lazy_import("pandas")
+
+FIGSIZE = (10, 6)
+DPI = 100
+# Rendered image width, series much denser than this can't show any more detail
+WIDTH_PX = FIGSIZE[0] * DPI
+# Fixed margins (figure fractions) sized for the 14pt ticks and 18pt axis labels, instead of tight_layout per
+# render. Wider tick labels (6 digit prices) don't fit, those renders fall back to tight_layout.
+MARGINS = dict(left=0.1, right=0.97, bottom=0.13, top=0.96)
+TEXT_COLOR = HexColors.WHITE
+
+# Pre-styled figures are reused between renders, one set per thread
+_templates = threading.local()
 
-# Set backend to Agg for headless environments
-plt.switch_backend("Agg")
+
+def _new_template():
+    fig = mfigure.Figure(figsize=FIGSIZE)
+    backend_agg.FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    # Transparent background
+    fig.patch.set_alpha(0.0)
+    ax.patch.set_alpha(0.0)
+
+    for spine in ax.spines.values():
+        spine.set_color(TEXT_COLOR)
+    ax.tick_params(axis="x", colors=TEXT_COLOR, labelcolor=TEXT_COLOR, labelsize=14)
+    ax.tick_params(axis="y", colors=TEXT_COLOR, labelcolor=TEXT_COLOR, labelsize=14)
+    ax.xaxis.label.set_color(TEXT_COLOR)
+    ax.xaxis.label.set_fontsize(18)
+    ax.yaxis.label.set_color(TEXT_COLOR)
+    ax.yaxis.label.set_fontsize(18)
+    return fig, ax
+
+
+def _get_template(layout):
+    """Get the styled figure and axes for a layout, with the previous render's artists cleared."""
+    templates = getattr(_templates, "figures", None)
+    if templates is None:
+        templates = _templates.figures = {}
+    if layout not in templates:
+        templates[layout] = _new_template()
+
+    fig, ax = templates[layout]
+    _clear(ax)
+    return fig, ax
+
+
+def _clear(ax):
+    for line in list(ax.lines):
+        line.remove()
+    legend = ax.get_legend()
+    if legend:
+        legend.remove()
+    # Restart the colour cycle so reused axes colour lines the same as a fresh figure
+    ax.set_prop_cycle(None)
 
 
 def generate_line_plot(df, x, y, xlabel=None, ylabel=None, legend_title=None, labels=None):
     """
     Generates a matplotlib figure for a line plot.
 
+    The figure is a reused, pre-styled template owned by the calling thread,
+    so it is only valid until that thread's next call.
+
     Args:
         df: DataFrame containing the data.
         x: Column name for x-axis or array-like data.
@@ -35,14 +94,6 @@ def generate_line_plot(df, x, y, xlabel=None, ylabel=None, legend_title=None, la
     if isinstance(y, str) and y in labels and not ylabel:
         ylabel = labels[y]
 
-    fig, ax = plt.subplots(figsize=(10, 6))
-
-    # Transparent background
-    fig.patch.set_alpha(0.0)
-    ax.patch.set_alpha(0.0)
-
-    text_color = HexColors.WHITE
-
     # Prepare x data
     if isinstance(x, str) and x in df.columns:
         x_data = df[x]
@@ -71,6 +122,10 @@ def generate_line_plot(df, x, y, xlabel=None, ylabel=None, legend_title=None, la
             # If timezone conversion fails, keep original data
             pass
 
+    is_datetime = hasattr(x_data, "dtype") and pd.api.types.is_datetime64_any_dtype(x_data)
+    # Date and numeric x axes keep different unit converters, so they get separate templates
+    fig, ax = _get_template(layout="datetime" if is_datetime else "numeric")
+
     # Plotting
     if isinstance(y, list):
         for col in y:
@@ -81,32 +136,28 @@ def generate_line_plot(df, x, y, xlabel=None, ylabel=None, legend_title=None, la
         label = labels.get(y, y)
         ax.plot(x_data, df[y], label=label, linewidth=3)
 
-    # Styling
-    for spine in ax.spines.values():
-        spine.set_color(text_color)
-
-    ax.tick_params(axis="x", colors=text_color, labelcolor=text_color, labelsize=14)
-    ax.tick_params(axis="y", colors=text_color, labelcolor=text_color, labelsize=14)
+    # Data limits still cover the previous render's lines until recomputed
+    ax.relim()
+    ax.autoscale_view()
 
-    if xlabel:
-        ax.set_xlabel(xlabel, color=text_color, fontsize=18)
-    if ylabel:
-        ax.set_ylabel(ylabel, color=text_color, fontsize=18)
+    ax.set_xlabel(xlabel or "")
+    ax.set_ylabel(ylabel or "")
 
     # Legend
     if legend_title or (isinstance(y, list) and len(y) > 1):
         legend = ax.legend(title=legend_title, fontsize=14, title_fontsize=16)
         if legend:
             legend.get_frame().set_alpha(0.0)
-            plt.setp(legend.get_texts(), color=text_color)
+            for text in legend.get_texts():
+                text.set_color(TEXT_COLOR)
             if legend.get_title():
-                plt.setp(legend.get_title(), color=text_color)
+                legend.get_title().set_color(TEXT_COLOR)
 
     # Auto-rotate date labels if applicable
     # fig.autofmt_xdate()
 
     # Use ConciseDateFormatter for better date/time labels
-    if hasattr(x_data, "dtype") and pd.api.types.is_datetime64_any_dtype(x_data):
+    if is_datetime:
         # Extract timezone from data if available
         tz = None
         if hasattr(x_data, "dtype") and hasattr(x_data.dtype, "tz"):
@@ -117,18 +168,29 @@ def generate_line_plot(df, x, y, xlabel=None, ylabel=None, legend_title=None, la
         ax.xaxis.set_major_locator(locator)
         ax.xaxis.set_major_formatter(formatter)
 
-    plt.tight_layout()
+    _fit_margins(fig, ax)
     return fig
 
 
+def _fit_margins(fig, ax):
+    """Lay out with the fixed margins, or with tight_layout if the y tick labels are too wide for them."""
+    # A previous render may have left tight_layout's margins on the reused figure
+    fig.subplots_adjust(**MARGINS)
+    # Only the price axis varies in width, x labels are short dates or numbers
+    if ax.yaxis.get_tightbbox(fig.canvas.get_renderer()).x0 < 0:
+        fig.tight_layout()
+
+
 def generate_line_plot_image(df, x, y, **kwargs):
     fig = generate_line_plot(df, x, y, **kwargs)
-    return write_fig_to_tempfile(fig)
+    buf = write_fig_to_tempfile(fig)
+    # Drop the lines so the reused template doesn't hold on to the data
+    _clear(fig.axes[0])
+    return buf
 
 
 def write_fig_to_tempfile(fig):
     buf = io.BytesIO()
-    fig.savefig(buf, format="png", transparent=True, dpi=100)
-    plt.close(fig)
+    fig.savefig(buf, format="png", transparent=True, dpi=DPI)
     buf.seek(0)
     return buf
@@ -0,0 +1,116 @@
+import importlib
+import logging
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import attr
+
+
+@attr.s(frozen=True, slots=True)
+class ImportRecord:
+    name = attr.ib()
+    seconds = attr.ib()
+    rss_delta_bytes = attr.ib()
+
+
+# Timed imports in the order they finished, nested imports before the ones that pulled them in
+import_records = []
+_lazy_modules = {}
+
+
+def current_rss_bytes():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # No procfs (macOS), fall back to the peak
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+@contextmanager
+def record_import(name):
+    """Record how long the block took and how much memory it added under ``name``."""
+    rss_before = current_rss_bytes()
+    start = time.perf_counter()
+    yield
+    import_records.append(ImportRecord(name, time.perf_counter() - start, current_rss_bytes() - rss_before))
+
+
+def timed_import(name):
+    """Import a module, recording how long it took and how much memory it added."""
+    if name in sys.modules:
+        return sys.modules[name]
+    with record_import(name):
+        return importlib.import_module(name)
+
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access.
+
+    Keeps heavy dependencies (pandas, matplotlib, yfinance...) out of bot
+    startup. Only attribute access triggers the import, so module level code
+    can hold one without paying for it; ``except lazy.Error`` is fine too,
+    since the clause is only evaluated once something was raised.
+    """
+
+    def __init__(self, name, warm_up=True):
+        self._name = name
+        self._warm_up = warm_up
+        self._module = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_loaded(self):
+        return self._module is not None
+
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = timed_import(self._name)
+        return self._module
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+    def __repr__(self):
+        state = "loaded" if self.is_loaded else "not loaded"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazy_import(name, warm_up=True):
+    """Get a LazyModule for ``name``, shared by every module that asks for it.
+
+    Args:
+        name: Module to import on first use
+        warm_up: Whether ``warm_up`` imports it, off for modules the bot process itself never uses
+    """
+    if name not in _lazy_modules:
+        _lazy_modules[name] = LazyModule(name, warm_up=warm_up)
+    elif warm_up:
+        _lazy_modules[name]._warm_up = True
+    return _lazy_modules[name]
+
+
+def warm_up():
+    """Import every lazy module that hasn't been used yet, meant for a background thread once the bot is up."""
+    for module in list(_lazy_modules.values()):
+        if module.is_loaded or not module._warm_up:
+            continue
+        try:
+            module.load()
+        except Exception as e:
+            logging.error(f"Error warming up {module._name}: {e}")
+
+
+def import_report(records=None, limit=15):
+    """Slowest timed imports as log lines, with time and resident memory added."""
+    records = import_records if records is None else records
+    lines = [f"{'module':<45}{'ms':>8}{'RSS MiB':>10}"]
+    for record in sorted(records, key=lambda record: record.seconds, reverse=True)[:limit]:
+        lines.append(f"{record.name:<45}{record.seconds * 1000:>8.0f}{record.rss_delta_bytes / 2**20:>10.1f}")
+    return "\n".join(lines)
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def get_percent_change(current, previous):
     if current == previous:
         return 100.0
@@ -5,3 +8,30 @@ def get_percent_change(current, previous):
         return (abs(current - previous) / previous) * 100.0
     except ZeroDivisionError:
         return 0
+
+
+def min_max_downsample(x, y, max_points):
+    """Reduce a series to at most ``max_points`` points, keeping each bucket's low and high.
+
+    Points are split into ``max_points // 2`` equal buckets and only the
+    minimum and maximum of each survive, in their original order, so
+    spikes and dips still show up in a line plot. NaN points are dropped.
+
+    Returns:
+        tuple: The downsampled (x, y) numpy arrays
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    keep = ~np.isnan(y)
+    x, y = x[keep], y[keep]
+    buckets = max_points // 2
+    if len(y) <= max_points or buckets < 1:
+        return x, y
+
+    bucket_size = -(-len(y) // buckets)
+    # Pad with the last value so the points split into equal rows, padded indices are clipped back below
+    rows = np.pad(y, (0, buckets * bucket_size - len(y)), mode="edge").reshape(buckets, bucket_size)
+    offsets = np.arange(buckets) * bucket_size
+    indices = np.concatenate([offsets + rows.argmin(axis=1), offsets + rows.argmax(axis=1)])
+    indices = np.unique(np.minimum(indices, len(y) - 1))
+    return x[indices], y[indices]
@@ -0,0 +1,272 @@
+import bisect
+import contextvars
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from aiohttp import web
+
+# Seconds, from a cache hit up to a slow render or upstream timeout
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class Metric:
+    metric_type = None
+
+    def __init__(self, name, help_text, label_names, lock):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = lock
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple((name, labels[name]) for name in self.label_names)
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self):
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self):
+        for key, value in sorted(self.values().items()):
+            yield f"{self.name}{_format_labels(key)} {value}"
+
+
+class Histogram(Metric):
+    """Cumulative bucket counts, a sum and a count for each label combination."""
+
+    metric_type = "histogram"
+
+    def __init__(self, name, help_text, label_names, lock, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names, lock)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(counts):
+                counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def values(self):
+        """Label values to (non-cumulative bucket counts, sum, count)."""
+        with self._lock:
+            return {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+
+    def samples(self):
+        for key, (counts, total, count) in sorted(self.values().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_format_labels(key + (('le', bound),))} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {count}"
+            yield f"{self.name}_sum{_format_labels(key)} {total}"
+            yield f"{self.name}_count{_format_labels(key)} {count}"
+
+
+class MetricsRegistry:
+    """Process wide counters and histograms, rendered in the Prometheus text format.
+
+    Safe to update from the event loop and executor threads alike.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def counter(self, name, help_text, label_names=()):
+        return self._register(Counter(name, help_text, label_names, self._lock))
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, label_names, self._lock, buckets=buckets))
+
+    def _register(self, metric):
+        return self._metrics.setdefault(metric.name, metric)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+RUN_SECONDS = metrics.histogram(
+    "bot_run_seconds", "End to end duration of slash commands and task loop iterations", ("kind", "name", "outcome")
+)
+FIRST_RESPONSE_SECONDS = metrics.histogram(
+    "bot_command_first_response_seconds", "Time from receiving a command to deferring or responding", ("command",)
+)
+STAGE_SECONDS = metrics.histogram(
+    "bot_stage_seconds", "Duration of a stage (fetch, db, render, upload) within a command or task", ("run", "stage")
+)
+UPSTREAM_SECONDS = metrics.histogram(
+    "bot_upstream_seconds", "Duration of calls to upstream APIs", ("service", "operation", "outcome")
+)
+UPSTREAM_ERRORS = metrics.counter(
+    "bot_upstream_errors_total", "Failed calls to upstream APIs by exception type", ("service", "operation", "error")
+)
+
+
+class Run:
+    """A command or task loop iteration being timed."""
+
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.failed = False
+
+
+# Run the current code belongs to, labels its stages
+current_run = contextvars.ContextVar("current_run", default=None)
+
+
+@contextmanager
+def track_run(kind, name):
+    """Time a command or task loop iteration, labelling the stages timed inside it with its name.
+
+    Yields:
+        Run: Set ``failed`` (or call ``mark_failed``) for errors that were handled rather than raised
+    """
+    run = Run(kind, name)
+    token = current_run.set(run)
+    start = time.perf_counter()
+    try:
+        yield run
+    except BaseException:
+        run.failed = True
+        raise
+    finally:
+        current_run.reset(token)
+        RUN_SECONDS.observe(time.perf_counter() - start, kind=kind, name=name, outcome="error" if run.failed else "ok")
+
+
+def mark_failed():
+    """Count the current run as an error, for code that catches and logs its exceptions."""
+    run = current_run.get()
+    if run is not None:
+        run.failed = True
+
+
+@contextmanager
+def stage(name):
+    """Time a stage of the current command or task."""
+    run = current_run.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, run=run.name if run else "none", stage=name)
+
+
+def instrument_task(func):
+    """Time every iteration of a ``tasks.loop`` body, goes under the ``@tasks.loop`` decorator."""
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with track_run("task", func.__name__):
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def track_upstream(service, operation):
+    """Count and time a call to an upstream API, recording the exception type of failures."""
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except Exception as e:
+        outcome = "error"
+        UPSTREAM_ERRORS.inc(service=service, operation=operation, error=type(e).__name__)
+        raise
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start, service=service, operation=operation, outcome=outcome)
+
+
+class InstrumentedClient:
+    """Proxy that tracks every method call on the wrapped client as an upstream call."""
+
+    def __init__(self, client, service):
+        self._client = client
+        self._service = service
+
+    def __getattr__(self, name):
+        value = getattr(self._client, name)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            with track_upstream(self._service, name):
+                return value(*args, **kwargs)
+
+        return call
+
+
+def summarize(histogram, group_by):
+    """Count, error count and mean seconds of a histogram's observations grouped by some of its labels.
+
+    Returns:
+        dict: Grouped label values to (count, errors, mean seconds), errors from an "outcome" label
+    """
+    positions = [histogram.label_names.index(name) for name in group_by]
+    summary = {}
+    for key, (_, total, count) in histogram.values().items():
+        group = tuple(key[i][1] for i in positions)
+        group_count, group_errors, group_total = summary.get(group, (0, 0, 0.0))
+        errors = count if dict(key).get("outcome") == "error" else 0
+        summary[group] = (group_count + count, group_errors + errors, group_total + total)
+    return {group: (count, errors, total / count) for group, (count, errors, total) in summary.items()}
+
+
+class MetricsServer:
+    """Local HTTP endpoint serving the metrics for Prometheus to scrape at /metrics."""
+
+    def __init__(self, host, port, registry=metrics):
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self._runner = None
+
+    async def _handle_metrics(self, request):
+        return web.Response(text=self.registry.render(), content_type="text/plain", charset="utf-8")
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logging.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,44 @@
+import bisect
+
+
+def normalize(text):
+    return " ".join(text.casefold().split())
+
+
+class PrefixIndex:
+    """Sorted array of search keys for prefix lookups, results in their given rank order.
+
+    Args:
+        entries: (keys, item) pairs, best ranked first. Each item can be found by any of its keys.
+    """
+
+    def __init__(self, entries):
+        self.items = []
+        keyed = []
+        for rank, (keys, item) in enumerate(entries):
+            self.items.append(item)
+            keyed.extend((normalize(key), rank) for key in set(keys))
+        keyed.sort()
+        self._keys = [key for key, _ in keyed]
+        self._ranks = [rank for _, rank in keyed]
+
+    def __len__(self):
+        return len(self.items)
+
+    def matches(self, prefix, limit=25, max_scan=5000):
+        """Items with a key starting with ``prefix``, best ranked first.
+
+        At most ``max_scan`` keys are considered, so a very short prefix
+        stays cheap at the cost of possibly missing lower ranked items.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return self.items[:limit]
+
+        start = bisect.bisect_left(self._keys, prefix)
+        ranks = set()
+        for i in range(start, min(start + max_scan, len(self._keys))):
+            if not self._keys[i].startswith(prefix):
+                break
+            ranks.add(self._ranks[i])
+        return [self.items[rank] for rank in sorted(ranks)[:limit]]
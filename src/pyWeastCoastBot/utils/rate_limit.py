@@ -0,0 +1,68 @@
+import threading
+import time
+from functools import cached_property
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter.
+
+    Callers over the limit wait their turn instead of failing. Each call
+    reserves a token up front, so waiting callers are served in order.
+
+    Args:
+        rate: Tokens added per second
+        capacity: Most tokens that can build up, i.e. the largest burst
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = capacity
+        self._updated_at = clock()
+
+    def acquire(self):
+        """Take a token, blocking until one is available.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            wait = max(0.0, -self._tokens / self.rate)
+        if wait:
+            self._sleep(wait)
+        return wait
+
+
+class RateLimited:
+    """Proxy that takes a token from a bucket before every method call on the wrapped client.
+
+    Args:
+        client_factory: Creates the client on first use, so its library isn't imported until needed
+        bucket: TokenBucket shared by every call
+    """
+
+    def __init__(self, client_factory, bucket):
+        self._client_factory = client_factory
+        self._bucket = bucket
+
+    @cached_property
+    def _client(self):
+        return self._client_factory()
+
+    def __getattr__(self, name):
+        value = getattr(self._client, name)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            self._bucket.acquire()
+            return value(*args, **kwargs)
+
+        return call
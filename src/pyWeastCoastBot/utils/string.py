@@ -2,8 +2,20 @@ def format_percent(value):
     return f"{value:.2f}%"
 
 
-def format_money(value):
-    result = f"${abs(value):,.2f}"
+CURRENCY_SYMBOLS = {
+    "usd": "$",
+    "eur": "€",
+    "gbp": "£",
+    "jpy": "¥",
+    "cad": "CA$",
+    "aud": "A$",
+    "inr": "₹",
+}
+
+
+def format_money(value, currency="usd"):
+    symbol = CURRENCY_SYMBOLS.get(currency)
+    result = f"{symbol}{abs(value):,.2f}" if symbol else f"{abs(value):,.2f} {currency.upper()}"
     if value < 0:
         result = f"-{result}"
     return result
@@ -1,7 +1,9 @@
 import logging
 from datetime import datetime, timezone
 
-import dateparser
+from pyWeastCoastBot.utils.lazy_import import lazy_import
+
+dateparser = lazy_import("dateparser")
 
 
 def parse_utc_datetime(string_to_parse):
@@ -26,3 +28,10 @@ def utc_now():
 
 def is_same_day(first, second):
     return first.day == second.day and first.month == second.month and first.year == second.year
+
+
+def ensure_utc(value):
+    # SQLite hands back naive datetimes even for timezone aware columns
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value